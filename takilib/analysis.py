@@ -0,0 +1,146 @@
+"""
+win probability estimates by rollouts, from the point of view of a single player
+"""
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+import math
+import random
+import time
+
+from takilib.model import State, rules, state_from_game, determinized
+from takilib.tracker import UnseenCardTracker
+
+# (state, actions, rng) -> action
+RolloutPolicy = Callable[[State, List[tuple], random.Random], tuple]
+
+
+def random_rollout_policy(state: State, actions: List[tuple], rng: random.Random) -> tuple:
+    """
+    a random action, never drawing when a card can be played
+    """
+    if state.phase == 'turn' and len(actions) > 1:
+        actions = actions[:-1]
+    return rng.choice(actions)
+
+
+class Estimate(NamedTuple):
+    probability: float
+    low: float
+    high: float
+    rollouts: int
+
+
+def rollout(state: State, player: int, policy: RolloutPolicy, rng: random.Random, max_steps=2000) -> float:
+    """
+    the player's share of the win at the end of a single random playout, an unfinished game is a loss
+    """
+    for _ in range(max_steps):
+        if rules.is_terminal(state):
+            return rules.value(state, player)
+        if rules.is_chance(state):
+            state = rules.sample_outcome(state, rng)
+        else:
+            state = rules.apply(state, policy(state, rules.actions(state), rng))
+    return 0.0
+
+
+def _rollouts(roots: Sequence[State], actions: Sequence[tuple], player: int, policy: RolloutPolicy, seed: int,
+              max_steps: int) -> List[float]:
+    """
+    the summed values of every action, over one rollout from each root
+    """
+    rng = random.Random(seed)
+    ret = [0.0] * len(actions)
+    for root in roots:
+        for i, action in enumerate(actions):
+            ret[i] += rollout(rules.apply(root, action), player, policy, rng, max_steps)
+    return ret
+
+
+def _wilson(total: float, n: int, z: float) -> Tuple[float, float, float]:
+    if not n:
+        return 0.0, 0.0, 1.0
+    p = total / n
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return p, max(center - margin, 0.0), min(center + margin, 1.0)
+
+
+def estimate_win_probabilities(game, player, budget: float, policy: RolloutPolicy = random_rollout_policy,
+                               tracker: UnseenCardTracker = None, executor: Optional[Executor] = None,
+                               processes: Optional[int] = None, chunk=16, z=1.96, max_steps=2000,
+                               seed=None) -> Dict[tuple, Estimate]:
+    """
+    estimate the chance to win after each of the player's moves (as actions of the rules model), by rollouts from
+    hidden hands resampled with the player's tracker (a fresh one if not given).
+    rollouts run on executor (a process pool of its own if not given, or in this process if processes is 0) until
+    budget seconds pass or the confidence interval of the best move separates from the rest (a single move is estimated
+    for the whole budget).
+    """
+    root = state_from_game(game)
+    # a pending skip passes the turn on before anyone decides, so game.next_player is not necessarily the decider
+    if root.turn != player.index:
+        raise ValueError(f'it is not {player.name}\'s turn to decide')
+    own_tracker = tracker is None
+    if own_tracker:
+        tracker = UnseenCardTracker(game, player)
+    rng = random.Random(seed)
+    actions = rules.actions(root)
+    totals = [0.0] * len(actions)
+    count = 0
+
+    def task():
+        roots = []
+        for _ in range(chunk):
+            hands, deck = tracker.sample(rng)
+            roots.append(determinized(root, hands, deck))
+        return roots, actions, player.index, policy, rng.getrandbits(32), max_steps
+
+    def estimates():
+        return {a: Estimate(*_wilson(t, count, z), count) for (a, t) in zip(actions, totals)}
+
+    def separated():
+        if len(actions) == 1:
+            # a forced move is still estimated, for as long as the budget allows
+            return False
+        ests = estimates()
+        best = max(actions, key=lambda a: ests[a].probability)
+        return all(ests[best].low > ests[a].high for a in actions if a != best)
+
+    deadline = time.monotonic() + budget
+    try:
+        if processes == 0 and executor is None:
+            while time.monotonic() < deadline and not (count and separated()):
+                for i, v in enumerate(_rollouts(*task())):
+                    totals[i] += v
+                count += chunk
+        else:
+            own_executor = executor is None
+            if own_executor:
+                executor = ProcessPoolExecutor(processes)
+            try:
+                in_flight = set()
+                workers = getattr(executor, '_max_workers', 1)
+                while time.monotonic() < deadline and not (count and separated()):
+                    while len(in_flight) < 2 * workers:
+                        in_flight.add(executor.submit(_rollouts, *task()))
+                    done, in_flight = wait(in_flight, timeout=max(deadline - time.monotonic(), 0),
+                                           return_when=FIRST_COMPLETED)
+                    in_flight = set(in_flight)
+                    for future in done:
+                        for i, v in enumerate(future.result()):
+                            totals[i] += v
+                        count += chunk
+                for future in in_flight:
+                    future.cancel()
+            finally:
+                if own_executor:
+                    executor.shutdown(wait=False)
+    finally:
+        if own_tracker:
+            tracker.close()
+    return estimates()
+
+
+__all__ = ['RolloutPolicy', 'random_rollout_policy', 'Estimate', 'rollout', 'estimate_win_probabilities']
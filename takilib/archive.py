@@ -0,0 +1,51 @@
+from typing import Iterable, Iterator
+import os
+
+from takilib.card import Card, Color
+from takilib.stack import standard_kinds, kind_index, make_card
+
+_colors = list(Color)
+_color_codes = {c: i + 1 for (i, c) in enumerate(_colors)}
+
+
+class PileArchive:
+    """
+    an append-only file of played cards, two bytes per card: its kind and the color assigned to it (if any)
+    """
+    record_size = 2
+
+    def __init__(self, path: str, read_size=2 ** 16):
+        self.path = path
+        self.read_size = read_size - read_size % self.record_size
+        self._file = open(path, 'ab')
+        self._count = os.path.getsize(path) // self.record_size
+
+    def extend(self, cards: Iterable[Card]):
+        data = bytearray()
+        for card in cards:
+            data.append(kind_index[card.order_token()])
+            data.append(_color_codes.get(getattr(card, 'assigned_color', None), 0))
+        self._file.write(data)
+        self._count += len(data) // self.record_size
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self) -> Iterator[Card]:
+        self._file.flush()
+        with open(self.path, 'rb') as f:
+            while True:
+                chunk = f.read(self.read_size)
+                if not chunk:
+                    break
+                for i in range(0, len(chunk), self.record_size):
+                    card = make_card(standard_kinds[chunk[i]].order_token())
+                    if chunk[i + 1]:
+                        card.assigned_color = _colors[chunk[i + 1] - 1]
+                    yield card
+
+    def close(self):
+        self._file.close()
+
+
+__all__ = ['PileArchive']
@@ -0,0 +1,135 @@
+"""
+evaluate a policy on the decisions of many concurrent games at once.
+a decision is asked deep inside the effects of a card, so every game runs in a thread of its own that blocks at its
+decision points, once every running game is blocked the pending decisions are evaluated as a single batch.
+"""
+from typing import Callable, Iterable, List
+import threading
+
+import numpy as np
+
+from takilib.bot import Policy
+from takilib.choice import GameView
+from takilib.features import encode_view, pick_mask, color_mask, card_action, draw_action, color_actions, \
+    default_max_players
+from takilib.simulation import play_game
+
+# features (N, F) -> scores (N, A)
+PolicyFunction = Callable[[np.ndarray], np.ndarray]
+
+
+class _Request:
+    def __init__(self, features: np.ndarray, legal: np.ndarray):
+        self.features = features
+        self.legal = legal
+        self.action = None
+        self.ready = threading.Event()
+
+
+class BatchScheduler:
+    def __init__(self, policy_function: PolicyFunction, max_players=default_max_players, sample=False,
+                 rng: np.random.Generator = None):
+        self.policy_function = policy_function
+        self.max_players = max_players
+        self.sample = sample
+        self.random = rng or np.random.default_rng()
+        self._condition = threading.Condition()
+        self._pending: List[_Request] = []
+        self._running = 0
+        self.batches = 0
+        self.decisions = 0
+
+    def policy(self) -> 'BatchedPolicy':
+        return BatchedPolicy(self)
+
+    def decide(self, features: np.ndarray, legal: np.ndarray) -> int:
+        """
+        block the calling game until its decision is evaluated with the rest of the batch
+        """
+        request = _Request(features, legal)
+        with self._condition:
+            self._pending.append(request)
+            self._condition.notify_all()
+        request.ready.wait()
+        return request.action
+
+    def _evaluate(self, batch: List[_Request]):
+        features = np.stack([r.features for r in batch])
+        legal = np.stack([r.legal for r in batch])
+        scores = np.asarray(self.policy_function(features), dtype=np.float64)
+        scores = np.where(legal, scores, -np.inf)
+        if self.sample:
+            weights = np.exp(scores - scores.max(axis=1, keepdims=True))
+            cumulative = weights.cumsum(axis=1)
+            # scaled by the total so rounding can't push the draw past the last legal action
+            draws = self.random.random((len(batch), 1)) * cumulative[:, -1:]
+            actions = (cumulative <= draws).sum(axis=1)
+        else:
+            actions = scores.argmax(axis=1)
+        self.batches += 1
+        self.decisions += len(batch)
+        for request, action in zip(batch, actions):
+            request.action = int(action)
+            request.ready.set()
+
+    def _run_game(self, target: Callable[[], None], errors: list):
+        try:
+            target()
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._condition.notify_all()
+
+    def run(self, targets: Iterable[Callable[[], None]], concurrency=64):
+        """
+        run the targets (each plays a whole game) with up to concurrency of them at a time
+        """
+        targets = iter(targets)
+        errors = []
+        exhausted = False
+        while True:
+            with self._condition:
+                while not exhausted and self._running < concurrency:
+                    target = next(targets, None)
+                    if target is None:
+                        exhausted = True
+                        break
+                    self._running += 1
+                    threading.Thread(target=self._run_game, args=(target, errors), daemon=True).start()
+                self._condition.wait_for(lambda: len(self._pending) >= self._running)
+                if not self._running and exhausted:
+                    break
+                batch, self._pending = self._pending, []
+            if batch:
+                self._evaluate(batch)
+        if errors:
+            raise errors[0]
+
+    def play(self, games: Iterable, concurrency=64, max_turns=10_000):
+        """
+        play the games to their end, their bots' policies should be from this scheduler
+        """
+        self.run(((lambda g=g: play_game(g, max_turns)) for g in games), concurrency)
+
+
+class BatchedPolicy(Policy):
+    def __init__(self, scheduler: BatchScheduler):
+        self.scheduler = scheduler
+
+    def _features(self, player, game):
+        return encode_view(GameView(game, player), max_players=self.scheduler.max_players)
+
+    def pick_card(self, player, game, playable):
+        action = self.scheduler.decide(self._features(player, game), pick_mask(playable))
+        if action == draw_action:
+            return None
+        return next(c for c in playable if card_action(c) == action)
+
+    def choose_color(self, player, game):
+        action = self.scheduler.decide(self._features(player, game), color_mask())
+        return next(c for (c, a) in color_actions.items() if a == action)
+
+
+__all__ = ['PolicyFunction', 'BatchScheduler', 'BatchedPolicy']
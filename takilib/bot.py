@@ -0,0 +1,105 @@
+from typing import List, Optional, Iterable
+from collections import Counter
+import random
+
+from takilib.card import Card, Color, KingCard, ChangeColorCard, SuperTakiCard, TakiCard
+from takilib.player import Player
+
+
+class Policy:
+    """
+    the decisions of a bot. the default implementation plays the first playable card, and drops everything on a taki
+    """
+
+    def pick_card(self, player: Player, game, playable: List[Card]) -> Optional[Card]:
+        return playable[0] if playable else None
+
+    def choose_color(self, player: Player, game) -> Color:
+        return next(iter(Color))
+
+    def place_on_taki(self, player: Player, game, color: Color, placeables: List[Card]) -> List[Card]:
+        return placeables
+
+    def use_breaker(self, player: Player, game, breaker: Card) -> bool:
+        return True
+
+
+class RandomPolicy(Policy):
+    def __init__(self, rng: random.Random = None):
+        self.random = rng or random.Random()
+
+    def pick_card(self, player, game, playable):
+        if not playable:
+            return None
+        return self.random.choice(playable)
+
+    def choose_color(self, player, game):
+        return self.random.choice(list(Color))
+
+
+class HeuristicPolicy(Policy):
+    """
+    plays the color it holds the most of, keeping the wildcards for when nothing else can be played
+    """
+    wildcards = (KingCard, ChangeColorCard, SuperTakiCard)
+
+    def _colors(self, player):
+        return Counter(c.color for c in player.hand if hasattr(c, 'color'))
+
+    def pick_card(self, player, game, playable):
+        if not playable:
+            return None
+        colors = self._colors(player)
+
+        def score(card):
+            if isinstance(card, self.wildcards):
+                return -1
+            ret = colors[getattr(card, 'color', None)]
+            if isinstance(card, TakiCard):
+                ret *= 2
+            return ret
+
+        return max(playable, key=score)
+
+    def choose_color(self, player, game):
+        colors = self._colors(player)
+        if not colors:
+            return super().choose_color(player, game)
+        # the hand is a set, so ties are broken in the order of the colors rather than the order of the counter
+        return max(Color, key=colors.__getitem__)
+
+
+class BotPlayer(Player):
+    # bots never wait for input
+    cancellable_input = True
+
+    def __init__(self, *args, policy: Policy = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.policy = policy or RandomPolicy()
+
+    def playable(self, game) -> List[Card]:
+        return [c for c in sorted(self.hand) if c.can_play(game)]
+
+    def pick_card(self, game):
+        return self.policy.pick_card(self, game, self.playable(game))
+
+    def choose_color(self) -> Color:
+        return self.policy.choose_color(self, self.game)
+
+    def place_on_taki(self, color: Color) -> Iterable[Card]:
+        placeables = [c for c in sorted(self.hand) if getattr(c, 'color', color) == color]
+        if not placeables:
+            return []
+        return self.policy.place_on_taki(self, self.game, color, placeables)
+
+    def ask_breaker(self, cancel=None):
+        candidate = self.breaker_candidate()
+        if candidate and self.policy.use_breaker(self, self.game, candidate):
+            return candidate
+        return None
+
+    def confirm(self, prompt):
+        return True
+
+
+__all__ = ['Policy', 'RandomPolicy', 'HeuristicPolicy', 'BotPlayer']
@@ -29,6 +29,12 @@ class Card(ABC):
     def __str__(self):
         pass
 
+    def reset(self):
+        """
+        forget anything assigned to the card when it was played
+        """
+        pass
+
     def __iter__(self):
         """
         if the card has a sign and color, yield them here, in that order, otherwise return an empty iterator
@@ -158,6 +164,9 @@ class ChangeColorCard(Card):
         game.msg('color changed to ' + self.assigned_color._name_)
         game.active_sign = None
 
+    def reset(self):
+        self.assigned_color = None
+
     def __str__(self):
         if self.assigned_color:
             return 'change color (to ' + self.assigned_color._name_ + ')'
@@ -219,6 +228,9 @@ class SuperTakiCard(SignedCard):
         game.active_color = self.assigned_color
         _taki(self, game, player, self.assigned_color)
 
+    def reset(self):
+        self.assigned_color = None
+
     def __str__(self):
         if self.assigned_color:
             return 'SUPER TAKI (' + self.assigned_color._name_ + ')'
@@ -266,13 +278,12 @@ class PlusThreeCard(Card):
     def on_play(self, game, player):
         super().on_play(game, player)
 
-        for p in it.islice(game.players_by_order(start=player), 1, None):
-            breaker = p.ask_breaker()
-            if breaker:
-                game.msg(f'{p.name} broke the +3!')
-                game.register_played(breaker, p)
-                player.draw(3)
-                break
+        broken = game.ask_breakers(player)
+        if broken:
+            p, breaker = broken
+            game.msg(f'{p.name} broke the +3!')
+            game.register_played(breaker, p)
+            player.draw(3)
         else:
             for p in it.islice(game.players_by_order(start=player), 1, None):
                 p.draw(3)
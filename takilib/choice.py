@@ -3,6 +3,8 @@ from __future__ import annotations
 from typing import Generic, TypeVar, List, Union, Iterable
 
 import textwrap
+import threading
+import time
 from abc import ABC, abstractmethod
 from enum import Enum, auto
 import itertools as it
@@ -14,6 +16,51 @@ class AskAgain(Exception):
     pass
 
 
+class Cancelled(Exception):
+    pass
+
+
+class CancelToken:
+    """
+    cancels a prompt that is asked alongside others, either explicitly or once its deadline (in time.monotonic terms)
+    has passed
+    """
+
+    def __init__(self, deadline: float = None):
+        self.deadline = deadline
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    def remaining(self):
+        """
+        seconds until the deadline (None if there is none), 0 once cancelled
+        """
+        if self._event.is_set():
+            return 0
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0)
+
+    def cancelled(self):
+        return self.remaining() == 0
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        wait until the token is cancelled or timeout passes, returns whether it was cancelled
+        """
+        remaining = self.remaining()
+        if remaining is not None and (timeout is None or remaining < timeout):
+            timeout = remaining
+        self._event.wait(timeout)
+        return self.cancelled()
+
+    def check(self):
+        if self.cancelled():
+            raise Cancelled
+
+
 class DisplayInfo(Exception):
     def __init__(self, info):
         self.info = info
@@ -0,0 +1,206 @@
+"""
+self-play samples written to fixed-width record shards, that can be memory-mapped back for training
+"""
+from typing import List, Sequence, Dict, Callable, Iterator
+import json
+import os
+
+import numpy as np
+
+from takilib.bot import Policy
+from takilib.choice import GameView
+from takilib.features import feature_size, encode_view, n_actions, default_max_players, card_action, draw_action, \
+    color_actions, pick_mask, color_mask
+from takilib.simulation import bot_game, play_game
+
+manifest_name = 'manifest.json'
+
+
+def record_dtype(max_players=default_max_players) -> np.dtype:
+    return np.dtype([
+        ('features', np.float32, (feature_size(max_players),)),
+        ('legal', np.bool_, (n_actions,)),
+        ('action', np.int16),
+        ('outcome', np.int8),
+    ])
+
+
+def _dtype_to_json(dtype: np.dtype):
+    return [[name, dtype.fields[name][0].base.str, list(dtype.fields[name][0].shape)] for name in dtype.names]
+
+
+def _dtype_from_json(fields) -> np.dtype:
+    return np.dtype([(name, base, tuple(shape)) for (name, base, shape) in fields])
+
+
+class ShardWriter:
+    """
+    appends records to shard files in a directory, starting a new shard whenever the current one reaches shard_bytes.
+    the manifest lists the finished shards, and is rewritten whenever a shard is finished.
+    """
+
+    def __init__(self, directory: str, dtype: np.dtype, shard_bytes=256 * 2 ** 20, buffer_records=4096):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.dtype = dtype
+        self.shard_records = max(shard_bytes // dtype.itemsize, 1)
+        self.buffer = np.zeros(min(buffer_records, self.shard_records), dtype=dtype)
+        self.buffered = 0
+        self.shards: List[Dict] = []
+        self._file = None
+        self._file_records = 0
+
+    def _open_shard(self):
+        name = f'shard-{len(self.shards):05}.bin'
+        self._file = open(os.path.join(self.directory, name), 'wb')
+        self._file_records = 0
+        self.shards.append({'file': name, 'records': 0})
+
+    def _close_shard(self):
+        self._file.close()
+        self._file = None
+        self.shards[-1]['records'] = self._file_records
+        self._write_manifest()
+
+    def _write_manifest(self):
+        path = os.path.join(self.directory, manifest_name)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({
+                'dtype': _dtype_to_json(self.dtype),
+                'shards': [s for s in self.shards if s['records']],
+                'records': sum(s['records'] for s in self.shards),
+            }, f)
+        os.replace(path + '.tmp', path)
+
+    def flush(self):
+        written = 0
+        while written < self.buffered:
+            if self._file is None:
+                self._open_shard()
+            n = min(self.buffered - written, self.shard_records - self._file_records)
+            self.buffer[written:written + n].tofile(self._file)
+            self._file_records += n
+            written += n
+            if self._file_records == self.shard_records:
+                self._close_shard()
+        self.buffered = 0
+
+    def next_record(self) -> np.void:
+        """
+        the next record in the buffer, to be filled in place
+        """
+        if self.buffered == len(self.buffer):
+            self.flush()
+        ret = self.buffer[self.buffered]
+        self.buffered += 1
+        return ret
+
+    def write(self, records: np.ndarray):
+        written = 0
+        while written < len(records):
+            if self.buffered == len(self.buffer):
+                self.flush()
+            n = min(len(records) - written, len(self.buffer) - self.buffered)
+            self.buffer[self.buffered:self.buffered + n] = records[written:written + n]
+            self.buffered += n
+            written += n
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._close_shard()
+        else:
+            self._write_manifest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class Dataset(Sequence[np.memmap]):
+    """
+    the shards of a dataset directory, each memory-mapped as a read-only record array
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, manifest_name)) as f:
+            manifest = json.load(f)
+        self.dtype = _dtype_from_json(manifest['dtype'])
+        self.shards = [np.memmap(os.path.join(directory, s['file']), dtype=self.dtype, mode='r',
+                                 shape=(s['records'],))
+                       for s in manifest['shards']]
+
+    def __getitem__(self, item) -> np.memmap:
+        return self.shards[item]
+
+    def __len__(self):
+        return len(self.shards)
+
+    def records(self) -> int:
+        return sum(len(s) for s in self.shards)
+
+    def __iter__(self) -> Iterator[np.memmap]:
+        return iter(self.shards)
+
+
+class RecordingPolicy(Policy):
+    """
+    wraps a policy, keeping the features, legal actions and chosen action of every card and color decision
+    """
+
+    def __init__(self, inner: Policy, max_players=default_max_players):
+        self.inner = inner
+        self.max_players = max_players
+        self.samples = []
+
+    def pick_card(self, player, game, playable):
+        features = encode_view(GameView(game, player), max_players=self.max_players)
+        ret = self.inner.pick_card(player, game, playable)
+        action = draw_action if ret is None else card_action(ret)
+        self.samples.append((features, pick_mask(playable), action))
+        return ret
+
+    def choose_color(self, player, game):
+        features = encode_view(GameView(game, player), max_players=self.max_players)
+        ret = self.inner.choose_color(player, game)
+        self.samples.append((features, color_mask(), color_actions[ret]))
+        return ret
+
+    def place_on_taki(self, player, game, color, placeables):
+        return self.inner.place_on_taki(player, game, color, placeables)
+
+    def use_breaker(self, player, game, breaker):
+        return self.inner.use_breaker(player, game, breaker)
+
+
+def outcome(game, player) -> int:
+    """
+    1 for a sole winner, -1 for a loser, 0 for a tie or an unfinished game
+    """
+    if player not in game.winners:
+        return -1 if game.winners else 0
+    return 1 if len(game.winners) == 1 else 0
+
+
+def self_play(writer: ShardWriter, policies: Callable[[], Sequence[Policy]], games: int,
+              max_players=default_max_players, max_turns=10_000, **kwargs):
+    """
+    play games between fresh policies from a factory, and write every decision (labeled by the player's outcome)
+    """
+    for _ in range(games):
+        recorders = [RecordingPolicy(p, max_players) for p in policies()]
+        game = bot_game(recorders, **kwargs)
+        play_game(game, max_turns)
+        for player, recorder in zip(game.players, recorders):
+            result = outcome(game, player)
+            for features, legal, action in recorder.samples:
+                record = writer.next_record()
+                record['features'] = features
+                record['legal'] = legal
+                record['action'] = action
+                record['outcome'] = result
+
+
+__all__ = ['record_dtype', 'ShardWriter', 'Dataset', 'RecordingPolicy', 'outcome', 'self_play']
@@ -0,0 +1,119 @@
+"""
+a fixed-size numeric encoding of what a player knows (the same information as a GameView), and of their actions
+"""
+from typing import Optional
+
+import numpy as np
+
+from takilib.card import Card, Color
+from takilib.choice import GameView
+from takilib.gamestate import GameState
+from takilib.stack import standard_kinds, kind_index
+from takilib.__util__ import eq_to_all
+
+colors = list(Color)
+signs = sorted({c.sign for c in standard_kinds if hasattr(c, 'sign')})
+states = [GameState.normal, GameState.skip, GameState.plus, GameState.king, GameState.plus_two]
+
+n_kinds = len(standard_kinds)
+# an action is playing a card of a kind, drawing, or choosing a color
+draw_action = n_kinds
+color_actions = {c: n_kinds + 1 + i for (i, c) in enumerate(colors)}
+n_actions = n_kinds + 1 + len(colors)
+
+default_max_players = 8
+
+
+def feature_size(max_players=default_max_players):
+    return (3 * n_kinds  # own hand, top of the pile, last active card
+            + len(colors) + 2  # active color, or any/none
+            + len(signs) + 2  # active sign, or any/none
+            + len(states) + 1  # state and stake
+            + 1  # order
+            + max_players - 1  # other players' hand sizes, in turn order
+            + 2)  # deck and pile lengths
+
+
+def _one_hot_value(out, offset, options, value):
+    if value is eq_to_all:
+        out[offset + len(options)] = 1
+    elif value in options:
+        out[offset + options.index(value)] = 1
+    else:
+        out[offset + len(options) + 1] = 1
+    return offset + len(options) + 2
+
+
+def _kind(card: Optional[Card]):
+    if card is None:
+        return None
+    return kind_index[card.order_token()]
+
+
+def encode_view(view: GameView, out: np.ndarray = None, max_players=default_max_players) -> np.ndarray:
+    if out is None:
+        out = np.zeros(feature_size(max_players), dtype=np.float32)
+    else:
+        out[:] = 0
+    game = view.game
+    for card in view.player.hand:
+        out[_kind(card)] += 1
+    offset = n_kinds
+    top = _kind(next(view.pile(), None))
+    if top is not None:
+        out[offset + top] = 1
+    offset += n_kinds
+    active = _kind(view.last_active())
+    if active is not None:
+        out[offset + active] = 1
+    offset += n_kinds
+    offset = _one_hot_value(out, offset, colors, game.active_color)
+    offset = _one_hot_value(out, offset, signs, game.active_sign)
+    # staked states compare equal regardless of stake, so the index is found by equality
+    state = next((i for (i, s) in enumerate(states) if s == game.state), None)
+    if state is not None:
+        out[offset + state] = 1
+    offset += len(states)
+    out[offset] = getattr(game.state, 'stake', 0)
+    offset += 1
+    out[offset] = game.order or 0
+    offset += 1
+    for i, (_, hand_size) in enumerate(view.other_players()):
+        if i >= max_players - 1:
+            break
+        out[offset + i] = hand_size
+    offset += max_players - 1
+    out[offset] = view.deck_length()
+    out[offset + 1] = game.pile.size()
+    return out
+
+
+def card_action(card: Card) -> int:
+    return kind_index[card.order_token()]
+
+
+def pick_mask(playable, out: np.ndarray = None) -> np.ndarray:
+    """
+    the legal actions when picking a card, drawing is always legal
+    """
+    if out is None:
+        out = np.zeros(n_actions, dtype=np.bool_)
+    else:
+        out[:] = False
+    for card in playable:
+        out[card_action(card)] = True
+    out[draw_action] = True
+    return out
+
+
+def color_mask(out: np.ndarray = None) -> np.ndarray:
+    if out is None:
+        out = np.zeros(n_actions, dtype=np.bool_)
+    else:
+        out[:] = False
+    out[list(color_actions.values())] = True
+    return out
+
+
+__all__ = ['colors', 'signs', 'states', 'n_kinds', 'draw_action', 'color_actions', 'n_actions', 'default_max_players',
+           'feature_size', 'encode_view', 'card_action', 'pick_mask', 'color_mask']
@@ -1,49 +1,183 @@
-from typing import List, Union
+from typing import List, Union, Dict, Optional, Tuple
 
 import random
+import time
+import itertools as it
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 
 from takilib.message import Message
 from takilib.gamestate import GameState
-from takilib.stack import Deck, Pile
+from takilib.stack import Deck, CountDeck, Pile, kind_index
+from takilib.archive import PileArchive
+from takilib.card import Card
 from takilib.player import Player
+from takilib.choice import CancelToken
+from takilib.sink import Sink, StdoutSink, BufferedOutput, SpectatorChannel
+from takilib.seats import SeatRing
+from takilib.listener import GameListener, EmptyHands
+from takilib.zobrist import ZobristHasher
 
 
 class Game:
-    def __init__(self, deck: Union[Deck, int] = 1):
+    # changes to these are reported to the listeners
+    observed_fields = frozenset(('active_color', 'active_sign', 'state', 'order', 'next_player_index'))
+
+    def __init__(self, deck: Union[Deck, CountDeck, int] = 1, sink: Sink = ...,
+                 breaker_deadline: Optional[float] = None, pile_window: Optional[int] = None,
+                 pile_archive: PileArchive = None, rng: random.Random = None):
+        """
+        if breaker_deadline is set, the players that can break a +3 are asked all at once, and only those who answer
+        within that many seconds are considered. every player must then have cancellable_input, and players that are
+        prompted for a breaker must have their own sink.
+        if pile_window is set, only that many of the recent played cards are kept in memory, older ones are written to
+        pile_archive.
+        rng is used for the random choices of the game (the global random module by default)
+        """
+        self.listeners: List[GameListener] = []
+        self.random = rng or random
         self.players: List[Player] = []
+        if sink is ...:
+            sink = StdoutSink()
+        self.sink = sink
+        self.outputs: Dict[int, BufferedOutput] = {}
+        self.spectators = SpectatorChannel()
+        self.seats = SeatRing()
+        self.empty_hands = EmptyHands()
+        self.subscribe(self.empty_hands)
         if isinstance(deck, int):
-            deck = Deck.standard_deck(times=deck)
+            deck = Deck.standard_deck(shuffle=False, times=deck)
+            deck.shuffle(self.random)
+        elif isinstance(deck, CountDeck):
+            # a count deck draws with its own generator, it should be the game's so seeded games deal the same
+            deck.shuffle(self.random)
         self.deck = deck
-        self.pile = Pile()
+        self.pile = Pile(game=self, window=pile_window, archive=pile_archive)
         self.order = None
         self.state: GameState = GameState.no_game
         self.active_color = self.active_sign = ...
         self.next_player_index = None
+        self.winners: List[Player] = []
+        self.breaker_deadline = breaker_deadline
+        self.hasher = ZobristHasher(self)
+        self.subscribe(self.hasher)
+
+    def __setattr__(self, key, value):
+        if key in self.observed_fields:
+            old = self.__dict__.get(key, ...)
+            super().__setattr__(key, value)
+            self.notify('field_changed', key, old, value)
+        else:
+            super().__setattr__(key, value)
 
-    def add_player(self, name=..., type_=Player, **kwargs):
+    @property
+    def state_hash(self) -> int:
+        return self.hasher.value
+
+    def add_player(self, name=..., type_=Player, sink: Sink = None, **kwargs):
         assert self.state == GameState.no_game, 'can\'t add players mid-game'
         if name is ...:
             name = 'Player ' + str(len(self.players) + 1)
-        player = type_(name, self, index=len(self.players), **kwargs)
+        output = self.output_for(sink)
+        if self.breaker_deadline is not None:
+            if not type_.cancellable_input:
+                raise ValueError(f'{type_.__name__} can\'t be asked for a breaker with a deadline')
+            if type_.ask_breaker is Player.ask_breaker and any(p.output is output for p in self.players):
+                # concurrent prompts would be interleaved on a shared output
+                raise ValueError('players asked for a breaker with a deadline must have their own sink')
+        player = type_(name, self, index=self.seats.add(), output=output, **kwargs)
         self.players.append(player)
+        self.notify('player_added', player)
         self.msg('new player: ' + player.name)
         return player
 
+    def output_for(self, sink: Sink = None) -> BufferedOutput:
+        """
+        get the buffered output of a sink, players that share a sink share the output
+        """
+        if sink is None:
+            sink = self.sink
+        ret = self.outputs.get(id(sink))
+        if ret is None:
+            ret = self.outputs[id(sink)] = BufferedOutput(sink)
+        return ret
+
+    def add_spectator(self, sink: Sink):
+        self.spectators.append(sink)
+
+    def remove_spectator(self, sink: Sink):
+        self.spectators.remove(sink)
+
+    def subscribe(self, listener: GameListener):
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener: GameListener):
+        self.listeners.remove(listener)
+
+    def notify(self, event: str, *args):
+        for listener in self.listeners:
+            getattr(listener, event)(*args)
+
+    def flush(self):
+        for output in self.outputs.values():
+            output.flush()
+        self.spectators.flush()
+        self.notify('flushed')
+
     def msg(self, msg, inc_players=..., exc_players=...):
         if inc_players is not ...:
             if exc_players is not ...:
                 raise Exception('can\'t call msg with both players and excluded filled')
             players = inc_players
         elif exc_players is not ...:
+            exc_players = set(exc_players)
             players = [p for p in self.players if p not in exc_players]
         else:
             players = self.players
+        if inc_players is ...:
+            # spectators only see what is public
+            self.spectators.write(msg)
 
         message = Message(msg, src=None, dst=players, kind=Message.Kind.info)
         for p in players:
             p.print(message)
 
-    def setup_game(self, cards_per_player=8):
+    def reset(self, seed=None):
+        """
+        end the game and return every card to the deck, keeping the players, the outputs and the listeners so the game
+        can be set up again. if seed is given, the game's generator is seeded with it before the deck is reshuffled
+        """
+        if seed is not None:
+            if self.random is random:
+                self.random = random.Random(seed)
+            else:
+                self.random.seed(seed)
+        cards = []
+        for player in self.players:
+            hand = list(player.hand)
+            player.remove_cards(hand)
+            cards.extend(hand)
+        if self.pile:
+            cards.extend(self.pile.drain())
+        for card in cards:
+            card.reset()
+        self.deck.extend(cards)
+        if seed is not None and isinstance(self.deck, Deck):
+            # the same seed should deal the same game, whatever order the cards were returned in
+            self.deck.sort(key=lambda c: kind_index[c.order_token()])
+        self.deck.shuffle(self.random)
+        self.state = GameState.no_game
+        self.order = None
+        self.active_color = self.active_sign = ...
+        self.next_player_index = None
+        self.winners = []
+        for output in self.outputs.values():
+            output.last_broadcast = None
+        self.notify('game_reset')
+
+    def setup_game(self, cards_per_player=8, first: int = None, order: int = None):
+        """
+        the first player (by index) and the turn order are random unless given
+        """
         assert self.state == GameState.no_game, 'a game is already in progress'
         self.state = GameState.setup
         for _ in range(cards_per_player):
@@ -52,27 +186,30 @@ class Game:
         self.msg('all players have hands')
 
         if self.pile:
-            self.deck.extend(self.pile)
-            self.pile.clear()
-        while not self.pile.has_iter():
+            self.deck.extend(self.pile.drain())
+        while True:
             if not self.deck:
                 raise Exception('no starter cards in the deck!')
             card = self.deck.pop()
-            self.pile.append(card)
             if card.is_iter():
                 self.msg('starter card: ' + str(card))
                 break
-            else:
-                self.msg('invalid starter: ' + str(card))
-        card = self.pile.last_iter()
+            self.pile.append(card)
+            self.msg('invalid starter: ' + str(card))
+        # the starter is placed on the pile when it is played
         card.on_play(self, None)  # an iter card should function when player is None
         assert ... not in (self.active_color, self.active_sign)
 
-        self.next_player_index = random.randint(0, len(self.players) - 1)
+        if first is None:
+            first = self.random.randrange(len(self.seats))
+        self.next_player_index = first
         self.msg('starting player ' + self.next_player.name)
-        self.order = random.choice([-1, 1])
+        if order is None:
+            order = self.random.choice([-1, 1])
+        self.order = order
         self.msg('turn order: ' + ('normal' if self.order == 1 else 'reversed'))
         self.state = GameState.normal
+        self.flush()
 
     @property
     def next_player(self):
@@ -97,20 +234,56 @@ class Game:
     def last_iter_card(self):
         return self.pile.last_iter()
 
+    def ask_breakers(self, player: Player) -> Optional[Tuple[Player, Card]]:
+        """
+        ask the players after player whether they break a +3, the first of them in turn order that does wins out
+        """
+        eligible = [p for p in it.islice(self.players_by_order(player), 1, None) if p.breaker_candidate()]
+        if self.breaker_deadline is None:
+            for p in eligible:
+                breaker = p.ask_breaker()
+                if breaker:
+                    return p, breaker
+            return None
+
+        if not eligible:
+            return None
+        cancel = CancelToken(time.monotonic() + self.breaker_deadline)
+        ret = None
+        # leaving the executor waits for every prompt, those still open are cancelled first so none outlives the call
+        with ThreadPoolExecutor(len(eligible), thread_name_prefix='breaker') as executor:
+            futures = [(p, executor.submit(p.ask_breaker, cancel)) for p in eligible]
+            try:
+                for p, future in futures:
+                    try:
+                        breaker = future.result(timeout=cancel.remaining())
+                    except TimeoutError:
+                        continue
+                    if breaker:
+                        ret = p, breaker
+                        break
+            finally:
+                cancel.cancel()
+        return ret
+
     def players_by_order(self, start: Player):
         yield start
-        i = start.index
-        while True:
-            i = self.normalize_next_ind(i + self.order)
-            p = self.players[i]
-            if p == start:
-                break
-            yield p
+        i = self.seats.step(start.index, self.order)
+        while i != start.index:
+            yield self.players[i]
+            i = self.seats.step(i, self.order)
 
     def next_turn(self):
+        try:
+            return self._next_turn()
+        finally:
+            self.flush()
+
+    def _next_turn(self):
         if self.state == GameState.normal or self.state == GameState.plus_two:
             selection = self.next_player.pick_card(self)
             if selection is None:
+                self.notify('passed', self.next_player)
                 amount = 1
                 if self.state == GameState.plus_two:
                     amount = self.state.stake
@@ -125,10 +298,9 @@ class Game:
             raise Exception('invalid state ' + repr(self.state))
 
         if self.state != GameState.plus and self.state != GameState.plus_two:
-            winners = []
-            for p in self.players:
-                if not p.hand:
-                    winners.append(p)
+            winners = sorted(self.empty_hands.players, key=lambda p: p.index)
+            if winners:
+                self.winners = winners
             if len(winners) == 1:
                 self.msg('Winner: ' + winners[0].name)
                 return False
@@ -137,8 +309,7 @@ class Game:
                 return False
 
         if self.state != GameState.plus and self.state != GameState.king:
-            self.next_player_index += self.order
-            self.normalize_next_ind()
+            self.next_player_index = self.seats.step(self.next_player_index, self.order)
         else:
             self.state = GameState.normal
         return True
@@ -146,7 +317,7 @@ class Game:
     def draw(self):
         if not self.deck:
             self.msg('reloading deck')
-            new_cards = self.pile.pop_disposable()
-            self.deck.extend(new_cards)
-            self.deck.shuffle()
+            composition = self.deck.reload(self.pile)
+            self.notify('pile_reloaded', composition)
+            self.deck.shuffle(self.random)
         return self.deck.pop()
@@ -0,0 +1,68 @@
+class GameListener:
+    """
+    base class for objects that follow the changes of a game, every callback does nothing by default
+    """
+
+    def player_added(self, player):
+        pass
+
+    def hand_changed(self, player, card, added: bool):
+        pass
+
+    def field_changed(self, name: str, old, new):
+        pass
+
+    def card_placed(self, card):
+        pass
+
+    def pile_cleared(self):
+        pass
+
+    def pile_reloaded(self, composition):
+        """
+        cards from the pile were returned to the deck, composition counts them by order token
+        """
+        pass
+
+    def game_reset(self):
+        """
+        the game was reset, every card is back in the deck
+        """
+        pass
+
+    def passed(self, player):
+        """
+        the player is about to draw instead of playing a card
+        """
+        pass
+
+    def flushed(self):
+        """
+        the game's output was flushed, at the end of a turn
+        """
+        pass
+
+
+class EmptyHands(GameListener):
+    """
+    keeps the players whose hands are empty
+    """
+
+    def __init__(self):
+        self.players = set()
+
+    def player_added(self, player):
+        if not player.hand:
+            self.players.add(player)
+
+    def hand_changed(self, player, card, added: bool):
+        if added:
+            self.players.discard(player)
+        elif not player.hand:
+            self.players.add(player)
+
+    def __bool__(self):
+        return bool(self.players)
+
+
+__all__ = ['GameListener', 'EmptyHands']
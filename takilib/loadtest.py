@@ -0,0 +1,258 @@
+"""
+a load generator for interactive play: many tables of scripted clients, driven through Player.input like humans, with
+the decision round-trip latency and the memory per table reported as they play
+"""
+from typing import List, Tuple, Optional
+from collections import Counter
+
+import argparse
+import gc
+import math
+import random
+import sys
+import threading
+import textwrap
+import time
+import traceback
+import tracemalloc
+
+from takilib.game import Game
+from takilib.player import Player, ExcludeByIndOption
+from takilib.choice import Choice, Option, OptionGroup, StandardOption, InfoOption
+from takilib.sink import NullSink
+
+
+def option_keys(option: Option) -> List[Tuple[str, Option.Kind]]:
+    """
+    every response an option accepts (a single one for options that accept a range), with its kind
+    """
+    if isinstance(option, OptionGroup):
+        return [k for o in option for k in option_keys(o)]
+    if isinstance(option, StandardOption):
+        return [(k, option.kind) for k in sorted(option.keys)]
+    if isinstance(option, InfoOption):
+        return [('I', option.get_kind())]
+    if isinstance(option, ExcludeByIndOption) and option.master_sequence:
+        return [(option.prefix + '0', option.kind)]
+    return []
+
+
+class LatencyHistogram:
+    """
+    latencies in logarithmic buckets, so that percentiles can be taken over any number of samples in constant memory
+    """
+    base = 1e-6
+    growth = 1.05
+
+    def __init__(self, buckets=600):
+        self.counts = [0] * buckets
+        self.total = 0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        ind = 0
+        if seconds > self.base:
+            ind = min(int(math.log(seconds / self.base, self.growth)) + 1, len(self.counts) - 1)
+        with self._lock:
+            self.counts[ind] += 1
+            self.total += 1
+            self.max = max(self.max, seconds)
+
+    def percentile(self, p: float) -> float:
+        """
+        the upper edge of the bucket that holds the p-th percentile
+        """
+        if not self.total:
+            return math.nan
+        rank = p / 100 * self.total
+        seen = 0
+        for ind, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(self.base * self.growth ** ind, self.max)
+        return self.max
+
+
+class ScriptedClient:
+    """
+    how a scripted human answers a choice: mostly valid moves, with a share of bad inputs, info requests and declined
+    confirmations
+    """
+
+    def __init__(self, rng: random.Random, bad_input=0.05, info=0.05, undo=0.1, think=0.0):
+        self.random = rng
+        self.bad_input = bad_input
+        self.info = info
+        self.undo = undo
+        self.think = think
+
+    def respond(self, choice: Choice) -> str:
+        if self.think:
+            time.sleep(self.random.expovariate(1 / self.think))
+        keys = option_keys(choice)
+        roll = self.random.random()
+        if roll < self.bad_input:
+            return '?' + str(self.random.randrange(100))
+        roll -= self.bad_input
+        if roll < self.info and any(kind == Option.Kind.info for (_, kind) in keys):
+            return 'I'
+        undo = [k for (k, kind) in keys if kind == Option.Kind.undo]
+        if undo and self.random.random() < self.undo:
+            return self.random.choice(undo)
+        rest = [k for (k, kind) in keys if kind not in (Option.Kind.undo, Option.Kind.info)]
+        # an empty response draws or ends a taki, humans rarely do that while they can play
+        moves = [k for k in rest if k]
+        if moves and self.random.random() < 0.9:
+            return self.random.choice(moves)
+        return self.random.choice(rest or undo)
+
+
+class Table:
+    """
+    a table that plays game after game, timing every decision from a client's response to the next prompt
+    """
+
+    def __init__(self, players: int, latencies: LatencyHistogram, rng: random.Random, **client_args):
+        self.players = players
+        self.latencies = latencies
+        self.random = rng
+        self.client_args = client_args
+        self.games = 0
+        self.decisions = 0
+        # counts by exception type and message, with the traceback of the first of each
+        self.errors = Counter()
+        self.tracebacks = {}
+        self.last_response: Optional[float] = None
+
+    def new_game(self) -> Game:
+        game = Game(sink=NullSink(), rng=self.random)
+        for _ in range(self.players):
+            game.add_player(type_=ScriptedPlayer, table=self,
+                            client=ScriptedClient(random.Random(self.random.getrandbits(64)), **self.client_args))
+        return game
+
+    def play(self, stop: threading.Event, max_turns=10_000):
+        while not stop.is_set():
+            game = self.new_game()
+            self.last_response = None
+            try:
+                game.setup_game()
+                for _ in range(max_turns):
+                    if stop.is_set() or not game.next_turn():
+                        break
+            except Exception as e:
+                key = f'{type(e).__name__}: {e}'
+                if key not in self.errors:
+                    self.tracebacks[key] = traceback.format_exc()
+                self.errors[key] += 1
+            self.games += 1
+
+
+class ScriptedPlayer(Player):
+    def __init__(self, *args, table: Table, client: ScriptedClient, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.table = table
+        self.client = client
+
+    def read_input(self, prompt: str, choice: Choice, cancel=None) -> str:
+        table = self.table
+        if table.last_response is not None:
+            table.latencies.add(time.perf_counter() - table.last_response)
+        response = self.client.respond(choice)
+        table.decisions += 1
+        table.last_response = time.perf_counter()
+        return response
+
+
+def memory_per_table(tables: int) -> float:
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    return current / tables
+
+
+def run(tables: int, players: int, duration: float, report_interval=10.0, trace_memory=False, seed=None,
+        out=sys.stdout, **client_args) -> LatencyHistogram:
+    """
+    play on the tables in parallel for duration seconds, printing a report line every report_interval seconds
+    """
+    rng = random.Random(seed)
+    latencies = LatencyHistogram()
+    if trace_memory:
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+    table_list = [Table(players, latencies, random.Random(rng.getrandbits(64)), **client_args) for _ in range(tables)]
+    stop = threading.Event()
+    threads = [threading.Thread(target=t.play, args=(stop,), daemon=True) for t in table_list]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+
+    memory_samples = []
+    reported_errors = set()
+
+    def report(final=False):
+        elapsed = time.perf_counter() - start
+        errors = sum((t.errors for t in table_list), Counter())
+        line = (f'{elapsed:9.0f}s games: {sum(t.games for t in table_list)} '
+                f'decisions: {sum(t.decisions for t in table_list)} errors: {sum(errors.values())} '
+                f'p50: {latencies.percentile(50) * 1e3:.3f}ms p99: {latencies.percentile(99) * 1e3:.3f}ms '
+                f'max: {latencies.max * 1e3:.3f}ms')
+        if trace_memory:
+            memory = memory_per_table(tables) - baseline / tables
+            if not final:
+                # the tables are idle after the run, only samples taken while playing are compared
+                memory_samples.append((elapsed, memory))
+            line += f' memory/table: {memory / 1024:.1f}KiB'
+        print(line, file=out, flush=True)
+        for key, n in errors.most_common():
+            print(f'    {n} x {key}', file=out)
+            if key not in reported_errors:
+                # the first time an error is seen, so is its traceback
+                reported_errors.add(key)
+                tb = next(t.tracebacks[key] for t in table_list if key in t.tracebacks)
+                print(textwrap.indent(tb, '    '), file=out, flush=True)
+
+    try:
+        while not stop.is_set():
+            stop.wait(min(report_interval, max(duration - (time.perf_counter() - start), 0)))
+            if time.perf_counter() - start >= duration:
+                stop.set()
+            else:
+                report()
+    except KeyboardInterrupt:
+        stop.set()
+    for t in threads:
+        t.join()
+    report(final=True)
+    if trace_memory:
+        if len(memory_samples) > 2:
+            # the first sample includes the warm up, the growth after it suggests a leak
+            (t0, m0), (t1, m1) = memory_samples[1], memory_samples[-1]
+            if t1 > t0:
+                print(f'memory growth per table: {(m1 - m0) / (t1 - t0) * 3600 / 1024:.1f}KiB/hour', file=out)
+        tracemalloc.stop()
+    return latencies
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='load test interactive play with scripted clients')
+    parser.add_argument('--tables', type=int, default=16)
+    parser.add_argument('--players', type=int, default=4, help='players per table')
+    parser.add_argument('--duration', type=float, default=60, help='seconds to play')
+    parser.add_argument('--report-interval', type=float, default=10, help='seconds between report lines')
+    parser.add_argument('--think', type=float, default=0, help='mean client think time in seconds')
+    parser.add_argument('--bad-input', type=float, default=0.05, help='share of bad inputs')
+    parser.add_argument('--info', type=float, default=0.05, help='share of info requests')
+    parser.add_argument('--undo', type=float, default=0.1, help='share of undos and declined confirmations')
+    parser.add_argument('--trace-memory', action='store_true', help='trace the memory per table (slower)')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(args)
+    run(args.tables, args.players, args.duration, args.report_interval, args.trace_memory, args.seed,
+        think=args.think, bad_input=args.bad_input, info=args.info, undo=args.undo)
+
+
+if __name__ == '__main__':
+    main()
+
+__all__ = ['option_keys', 'LatencyHistogram', 'ScriptedClient', 'Table', 'ScriptedPlayer', 'run', 'main']
@@ -0,0 +1,373 @@
+"""
+an immutable model of the rules of the game, for search and simulation.
+cards are represented by their kind (an index in standard_kinds), decks and piles by counts of every kind.
+"""
+from typing import NamedTuple, Tuple, Optional, List, Dict, Hashable, Sequence
+
+from takilib.card import Color, StandardCard, StopCard, TwoPlusCard, FlipOrderCard, PlusCard, TakiCard, \
+    SuperTakiCard, KingCard, ChangeColorCard, PlusThreeCard, BreakPlusThreeCard
+from takilib.gamestate import GameState
+from takilib.stack import standard_kinds, kind_index
+from takilib.__util__ import eq_to_all
+
+wild = '*'
+
+# the effect of every kind, the order matters since the special standard cards are standard cards too
+_effects = [(StopCard, 'stop'), (TwoPlusCard, '+2'), (FlipOrderCard, '<=>'), (PlusCard, '+'), (TakiCard, 'taki'),
+            (StandardCard, 'number'), (SuperTakiCard, 'supertaki'), (KingCard, 'king'),
+            (ChangeColorCard, 'changecolor'), (PlusThreeCard, '+3'), (BreakPlusThreeCard, '#3')]
+
+
+class Kind(NamedTuple):
+    index: int
+    token: Hashable
+    effect: str
+    color: Optional[Color]
+    sign: Optional[str]
+
+
+kinds: List[Kind] = [
+    Kind(i, card.order_token(), next(e for (t, e) in _effects if isinstance(card, t)),
+         getattr(card, 'color', None), getattr(card, 'sign', None) if isinstance(card, StandardCard) else None)
+    for (i, card) in enumerate(standard_kinds)
+]
+breaker_kind = next(k.index for k in kinds if k.effect == '#3')
+no_cards = (0,) * len(kinds)
+
+
+class State(NamedTuple):
+    hands: Tuple[Tuple[int, ...], ...]  # sorted kinds, by player index
+    deck: Tuple[int, ...]  # counts by kind
+    discard: Tuple[int, ...]  # pile cards that will be reloaded into the deck
+    retained: Tuple[int, ...]  # the last active card and the pile cards after it
+    color: Hashable
+    sign: Hashable
+    last: Tuple[Hashable, Hashable]  # the sign and color of the last active card
+    mode: str
+    stake: int
+    order: int
+    turn: int
+    phase: str = 'turn'
+    data: tuple = ()
+    draws: Tuple[Tuple[int, int], ...] = ()  # (player, count) still to be drawn
+    winners: Optional[Tuple[int, ...]] = None
+
+
+def _add(counts, kind, n=1):
+    return counts[:kind] + (counts[kind] + n,) + counts[kind + 1:]
+
+
+def _remove_from_hand(hand, kind):
+    i = hand.index(kind)
+    return hand[:i] + hand[i + 1:]
+
+
+def _matches(active, value):
+    return active == wild or active == value
+
+
+def _value(v):
+    if v is eq_to_all:
+        return wild
+    return v
+
+
+_modes = {GameState.normal: 'normal', GameState.skip: 'skip', GameState.plus: '+', GameState.king: 'king'}
+
+
+def _mode(state):
+    if state == GameState.plus_two:
+        return 'plus_two'
+    return _modes[state]
+
+
+def deck_tokens(state: State) -> List[Hashable]:
+    """
+    the tokens of the cards in the state's deck
+    """
+    return [kinds[k].token for (k, n) in enumerate(state.deck) for _ in range(n)]
+
+
+def determinized(state: State, hands: Dict[int, Sequence[Hashable]], deck: Sequence[Hashable]) -> State:
+    """
+    the state with some of the hands and the deck (as card tokens) replaced
+    """
+    hand_kinds = list(state.hands)
+    for ind, tokens in hands.items():
+        hand_kinds[ind] = tuple(sorted(kind_index[t] for t in tokens))
+    deck_counts = list(no_cards)
+    for t in deck:
+        deck_counts[kind_index[t]] += 1
+    return state._replace(hands=tuple(hand_kinds), deck=tuple(deck_counts))
+
+
+def state_from_game(game, hands: Dict[int, Sequence[Hashable]] = None, deck: Sequence[Hashable] = None) -> State:
+    """
+    the state of a game between turns, hands and the deck (as card tokens) can be given to determinize hidden cards
+    """
+    if hands is not None or deck is not None:
+        ret = state_from_game(game)
+        return determinized(ret, hands or {}, deck_tokens(ret) if deck is None else deck)
+    hand_kinds = [tuple(sorted(kind_index[c.order_token()] for c in p.hand)) for p in game.players]
+    deck_counts = list(no_cards)
+    for t, n in game.deck.composition().items():
+        deck_counts[kind_index[t]] += n
+    discard = list(no_cards)
+    for t, n in game.pile.disposable_composition().items():
+        discard[kind_index[t]] += n
+    retained = list(no_cards)
+    for c in game.pile.retained():
+        retained[kind_index[c.order_token()]] += 1
+    last = game.pile.last_iter()
+    ret = State(
+        hands=tuple(hand_kinds), deck=tuple(deck_counts), discard=tuple(discard), retained=tuple(retained),
+        color=_value(game.active_color), sign=_value(game.active_sign),
+        last=tuple(last.is_iter()) if last else (None, None), mode=_mode(game.state),
+        stake=getattr(game.state, 'stake', 0), order=game.order, turn=game.next_player_index,
+    )
+    if ret.mode == 'skip':
+        # the next player is skipped before anyone gets to decide
+        ret = ret._replace(mode='normal', turn=(ret.turn + ret.order) % len(ret.hands))
+    return ret
+
+
+class Rules:
+    """
+    the transitions between states. a state is either terminal, a chance node (there are cards to draw) or a decision
+    of a single player. a taki is a decision per card: any of the placeables can be dropped, one at a time, until the
+    taki is closed with a last card (or with nothing, if nothing was dropped)
+    """
+
+    def step(self, s: State, ind: int, order: int = None) -> int:
+        return (ind + (s.order if order is None else order)) % len(s.hands)
+
+    def is_terminal(self, s: State):
+        return s.winners is not None
+
+    def is_chance(self, s: State):
+        return bool(s.draws)
+
+    def decider(self, s: State) -> int:
+        if s.phase == 'breaker':
+            return s.data[1]
+        return s.turn
+
+    def can_play(self, s: State, kind: int):
+        k = kinds[kind]
+        if k.effect == 'king':
+            return True
+        if s.mode == 'plus_two':
+            return k.effect == '+2'
+        if s.mode != 'normal':
+            return False
+        if k.color is None:
+            return True
+        return _matches(s.color, k.color) or _matches(s.sign, k.sign)
+
+    def actions(self, s: State) -> List[tuple]:
+        hand = s.hands[s.turn]
+        if s.phase == 'turn':
+            ret = [('play', k) for k in sorted(set(hand)) if self.can_play(s, k)]
+            ret.append(('draw',))
+            return ret
+        if s.phase == 'color':
+            return [('color', c) for c in Color]
+        if s.phase == 'taki':
+            color, dropped = s.data
+            placeables = self.placeables(hand, color)
+            options = sorted(set(placeables))
+            # closing with nothing dropped places nothing, otherwise the closer is the last card placed
+            ret = [] if dropped else [('close', None)]
+            ret.extend(('close', k) for k in options)
+            if len(placeables) > 1:
+                # cards are dropped in order of kind, the order they are placed in doesn't depend on it
+                ret.extend(('drop', k) for k in options if not dropped or k >= dropped[-1])
+            return ret
+        if s.phase == 'breaker':
+            return [('break', True), ('break', False)]
+        raise ValueError(s.phase)
+
+    def placeables(self, hand, color):
+        return [k for k in hand if kinds[k].color in (color, None)]
+
+    # pile and hands
+
+    def _place(self, s: State, kind: int) -> State:
+        k = kinds[kind]
+        if k.color is not None:
+            # an active card, everything before it can be reloaded
+            discard = tuple(a + b for (a, b) in zip(s.discard, s.retained))
+            return s._replace(discard=discard, retained=_add(no_cards, kind), last=(k.sign, k.color))
+        return s._replace(retained=_add(s.retained, kind))
+
+    def _take(self, s: State, player: int, kind: int) -> State:
+        hands = list(s.hands)
+        hands[player] = _remove_from_hand(hands[player], kind)
+        return s._replace(hands=tuple(hands))
+
+    # transitions
+
+    def apply(self, s: State, action: tuple) -> State:
+        name = action[0]
+        if name == 'draw':
+            amount = s.stake if s.mode == 'plus_two' else 1
+            return self._resolve(s._replace(mode='normal', stake=0, draws=((s.turn, amount),)))
+        if name == 'play':
+            s = self._place(self._take(s, s.turn, action[1]), action[1])
+            return self._effect(s, action[1])
+        if name == 'color':
+            return self._chose_color(s, action[1])
+        if name == 'drop':
+            color, dropped = s.data
+            return self._take(s, s.turn, action[1])._replace(data=(color, dropped + (action[1],)))
+        if name == 'close':
+            return self._close_taki(s, action[1])
+        if name == 'break':
+            return self._breaker(s, action[1])
+        raise ValueError(action)
+
+    def _effect(self, s: State, kind: int) -> State:
+        k = kinds[kind]
+        if k.color is not None:
+            s = s._replace(color=k.color, sign=k.sign)
+        effect = k.effect
+        if effect == 'stop':
+            s = s._replace(mode='skip')
+        elif effect == '+2':
+            if s.mode == 'plus_two':
+                s = s._replace(stake=s.stake + 2)
+            else:
+                s = s._replace(mode='plus_two', stake=2)
+        elif effect == '<=>':
+            s = s._replace(order=-s.order)
+        elif effect == '+':
+            s = s._replace(mode='+')
+        elif effect == 'taki':
+            return self._taki(s, k.color)
+        elif effect == 'supertaki':
+            if s.sign == 'TAKI' or s.color == wild:
+                return s._replace(sign='TAKI', phase='color', data=('supertaki',))
+            return self._taki(s._replace(sign='TAKI'), s.color)
+        elif effect == 'king':
+            s = s._replace(color=wild, sign=wild, mode='king', stake=0)
+        elif effect == 'changecolor':
+            return s._replace(phase='color', data=('changecolor',))
+        elif effect == '+3':
+            return self._breaker_from(s, s.turn, self.step(s, s.turn))
+        elif effect == '#3':
+            s = s._replace(sign=s.last[0], color=s.last[1], draws=((s.turn, 3),))
+        return self._resolve(s)
+
+    def _chose_color(self, s: State, color: Color) -> State:
+        if s.data[0] == 'supertaki':
+            return self._taki(s._replace(color=color), color)
+        return self._resolve(s._replace(color=color, sign=None, phase='turn', data=()))
+
+    def _taki(self, s: State, color: Color) -> State:
+        if not self.placeables(s.hands[s.turn], color):
+            # a taki with nothing to place closes right away
+            return self._resolve(s._replace(phase='turn', data=()))
+        return s._replace(phase='taki', data=(color, ()))
+
+    def _close_taki(self, s: State, closer: Optional[int]) -> State:
+        dropped = s.data[1]
+        s = s._replace(phase='turn', data=())
+        if closer is None:
+            return self._resolve(s)
+        # placed in the order players see their hands, the dropped cards already left the hand
+        for kind in sorted(dropped, key=lambda k: kinds[k].token):
+            s = self._place(s, kind)
+        s = self._place(self._take(s, s.turn, closer), closer)
+        return self._effect(s, closer)
+
+    def _breaker_from(self, s: State, player: int, ind: int) -> State:
+        while ind != player:
+            if breaker_kind in s.hands[ind]:
+                return s._replace(phase='breaker', data=(player, ind))
+            ind = self.step(s, ind)
+        draws = []
+        ind = self.step(s, player)
+        while ind != player:
+            draws.append((ind, 3))
+            ind = self.step(s, ind)
+        return self._resolve(s._replace(sign=s.last[0], color=s.last[1], phase='turn', data=(), draws=tuple(draws)))
+
+    def _breaker(self, s: State, use: bool) -> State:
+        player, ind = s.data
+        if not use:
+            return self._breaker_from(s, player, self.step(s, ind))
+        s = self._place(self._take(s, ind, breaker_kind), breaker_kind)
+        return self._resolve(s._replace(sign=s.last[0], color=s.last[1], phase='turn', data=(), draws=((player, 3),)))
+
+    def _resolve(self, s: State) -> State:
+        """
+        end the turn, unless there are cards to draw first
+        """
+        if s.draws or s.phase != 'turn':
+            return s
+        if s.mode not in ('+', 'plus_two'):
+            winners = tuple(i for (i, h) in enumerate(s.hands) if not h)
+            if winners:
+                return s._replace(winners=winners)
+        if s.mode in ('+', 'king'):
+            return s._replace(mode='normal')
+        turn = self.step(s, s.turn)
+        if s.mode == 'skip':
+            return s._replace(mode='normal', turn=self.step(s, turn))
+        return s._replace(turn=turn)
+
+    def outcomes(self, s: State) -> List[Tuple[float, State]]:
+        """
+        the outcomes of drawing the next card, with their probabilities
+        """
+        (player, count), rest = s.draws[0], s.draws[1:]
+        deck, discard = s.deck, s.discard
+        if not any(deck):
+            deck, discard = discard, no_cards
+        if not any(deck):
+            # there is nothing left to draw
+            return [(1.0, self._resolve(s._replace(draws=rest)))]
+        if count > 1:
+            rest = ((player, count - 1),) + rest
+        total = sum(deck)
+        ret = []
+        for kind, n in enumerate(deck):
+            if not n:
+                continue
+            hands = list(s.hands)
+            hands[player] = tuple(sorted(hands[player] + (kind,)))
+            ret.append((n / total, self._resolve(s._replace(
+                hands=tuple(hands), deck=_add(deck, kind, -1), discard=discard, draws=rest))))
+        return ret
+
+    def sample_outcome(self, s: State, rng) -> State:
+        """
+        draw the next card at random, cheaper than listing every outcome
+        """
+        (player, count), rest = s.draws[0], s.draws[1:]
+        deck, discard = s.deck, s.discard
+        if not any(deck):
+            deck, discard = discard, no_cards
+        if not any(deck):
+            return self._resolve(s._replace(draws=rest))
+        if count > 1:
+            rest = ((player, count - 1),) + rest
+        ind = rng.randrange(sum(deck))
+        for kind, n in enumerate(deck):
+            ind -= n
+            if ind < 0:
+                break
+        hands = list(s.hands)
+        hands[player] = tuple(sorted(hands[player] + (kind,)))
+        return self._resolve(s._replace(hands=tuple(hands), deck=_add(deck, kind, -1), discard=discard, draws=rest))
+
+    def value(self, s: State, player: int) -> float:
+        if player not in s.winners:
+            return 0.0
+        return 1 / len(s.winners)
+
+
+rules = Rules()
+
+__all__ = ['wild', 'Kind', 'kinds', 'breaker_kind', 'State', 'deck_tokens', 'determinized', 'state_from_game', 'Rules',
+           'rules']
@@ -4,10 +4,11 @@ from functools import partial
 
 from takilib.card import Card, Color, BreakPlusThreeCard
 from takilib.stack import Hand
-from takilib.choice import Choice, StandardOption, OptionGroup, NOption, Option, T, AskAgain, DisplayInfo
+from takilib.choice import Choice, StandardOption, OptionGroup, NOption, Option, T, AskAgain, DisplayInfo, \
+    CancelToken, Cancelled
 from takilib.message import Message
+from takilib.sink import BufferedOutput
 
-print_ = print
 input_ = input
 
 color_choice = Choice('Choose a color',
@@ -24,30 +25,38 @@ confirm_choice_creator = partial(Choice, options=[StandardOption(['y', ''], '',
 
 class Player:
     single_view = False
-    msg_cache = None
+    # whether read_input honours cancel tokens, only such players can be asked for a breaker alongside others
+    cancellable_input = False
 
     def print(self, message: Union[Message, str], **kwargs):
         if isinstance(message, str):
             message = Message(message, src=self, dst=(self,), **kwargs)
 
         if self.single_view and len(message.dst) > 1:
-            if Player.msg_cache == message:
+            # players that share an output would all see the same broadcast
+            if self.output.last_broadcast is message:
                 return
             else:
-                Player.msg_cache = message
+                self.output.last_broadcast = message
         msg = message.msg
         if message.kind == Message.Kind.choice:
             assert len(message.dst) == 1, 'a choice should only have one recipient'
             if self.single_view:
                 msg = self.name + ': ' + msg
-        print_(msg)
+        self.output.write(msg)
 
-    def input(self, choice: Choice[T], info=False) -> T:
+    def input(self, choice: Choice[T], info=False, cancel: CancelToken = None) -> T:
+        """
+        raises Cancelled if cancel is cancelled before a valid response is given
+        """
         if info:
             choice.set_info(self.game, self)
         self.print(str(choice), kind=Message.Kind.choice)
         while True:
-            response = input_('' if choice.inline else 'enter input:')
+            self.output.flush()
+            if cancel is not None:
+                cancel.check()
+            response = self.read_input('' if choice.inline else 'enter input:', choice, cancel)
             try:
                 return choice[response]
             except KeyError:
@@ -57,12 +66,22 @@ class Player:
             except DisplayInfo as di:
                 self.print(str(di.info), kind=Message.Kind.info)
 
-    def __init__(self, name, game, index: int, first_person=False):
+    def read_input(self, prompt: str, choice: Choice, cancel: CancelToken = None) -> str:
+        """
+        get a single response to a choice, the choice has already been printed. players with cancellable_input must
+        raise Cancelled as soon as cancel is cancelled (the builtin input can't be interrupted, so it ignores it)
+        """
+        return input_(prompt)
+
+    def __init__(self, name, game, index: int, first_person=False, output: BufferedOutput = None):
         self.name = name
         self.game = game
+        if output is None:
+            output = game.output_for()
+        self.output = output
         self.first_person = first_person
         self.index = index
-        self.hand = Hand()
+        self.hand = Hand(owner=self)
 
     def you(self, capital=True):
         if self.first_person:
@@ -147,10 +166,21 @@ class Player:
             card_num = str(num) + ' cards'
         self.game.msg(f'{self.name} drew {card_num}', exc_players=[self])
 
-    def ask_breaker(self):
-        candidate = next((c for c in self.hand if isinstance(c, BreakPlusThreeCard)), None)
+    def breaker_candidate(self):
+        return next((c for c in self.hand if isinstance(c, BreakPlusThreeCard)), None)
+
+    def ask_breaker(self, cancel: CancelToken = None):
+        candidate = self.breaker_candidate()
+        if not candidate:
+            return None
         choice = use_breaker_choice_creator(f'{self.you()} have a +3 breaker, play it?')
-        if candidate and self.input(choice, info=True):
+        try:
+            use = self.input(choice, info=True, cancel=cancel)
+        except Cancelled:
+            self.print('too late to play a +3 breaker', kind=Message.Kind.info)
+            self.output.flush()
+            return None
+        if use:
             return candidate
         return None
 
@@ -0,0 +1,88 @@
+"""
+the chances that drawing cards yields at least one card of a category (a color, a sign, a +2 or a breaker).
+drawing without replacement, at least one card of a category depends only on the number of cards, the number of
+cards in the category and the number of draws, so it is computed for many compositions at once from those counts
+"""
+from typing import Dict, Hashable, List, Tuple, Union
+from functools import lru_cache
+
+import numpy as np
+
+from takilib.card import Color, BreakPlusThreeCard
+from takilib.features import signs
+from takilib.stack import standard_kinds, kind_index
+from takilib.tracker import color_of, sign_of
+
+categories: List[Tuple[str, Hashable]] = \
+    [('color', c) for c in Color] + [('sign', s) for s in signs] + [('breaker', None)]
+category_index: Dict[Tuple[str, Hashable], int] = {c: i for (i, c) in enumerate(categories)}
+
+
+def _in_category(card, category):
+    kind, value = category
+    if kind == 'color':
+        return color_of(card) == value
+    if kind == 'sign':
+        return sign_of(card) == value
+    return isinstance(card, BreakPlusThreeCard)
+
+
+# (kinds, categories)
+membership = np.array([[_in_category(card, c) for c in categories] for card in standard_kinds], dtype=np.int64)
+
+
+def miss(totals: np.ndarray, hits: np.ndarray, draws: np.ndarray) -> np.ndarray:
+    """
+    the chances that k cards drawn from n cards, m of them in a category, are none of the category: the product of
+    (n - m - j) / (n - j) for j < k. the arguments are broadcastable arrays of counts, draws must not exceed totals
+    """
+    n = np.asarray(totals, dtype=np.float64)[..., None]
+    m = np.asarray(hits, dtype=np.float64)[..., None]
+    k = np.asarray(draws)[..., None]
+    j = np.arange(k.max(initial=0), dtype=np.float64)
+    # j < k <= n, so the denominator is at least 1
+    ratio = np.clip((n - m - j) / np.maximum(n - j, 1), 0, 1)
+    return np.where(j < k, ratio, 1).prod(axis=-1)
+
+
+def at_least_one_batch(compositions: np.ndarray, draws: Union[int, np.ndarray]) -> np.ndarray:
+    """
+    compositions is (B, kinds) counts, draws is a count or (B,) counts. returns (B, categories) probabilities
+    """
+    compositions = np.asarray(compositions, dtype=np.int64)
+    totals = compositions.sum(axis=1)
+    hits = compositions @ membership
+    draws = np.minimum(np.broadcast_to(draws, totals.shape), totals)
+    return 1 - miss(totals[:, None], hits, draws[:, None])
+
+
+def composition_vector(counts: Dict[Hashable, int]) -> np.ndarray:
+    """
+    counts by card token as a vector of counts by kind
+    """
+    ret = np.zeros(len(standard_kinds), dtype=np.int64)
+    for token, n in counts.items():
+        ret[kind_index[token]] += n
+    return ret
+
+
+def unseen_vector(tracker) -> np.ndarray:
+    return composition_vector(tracker.cards)
+
+
+@lru_cache(maxsize=2 ** 14)
+def _cached(composition: Tuple[int, ...], draws: int) -> np.ndarray:
+    ret = at_least_one_batch(np.array([composition]), draws)[0]
+    ret.flags.writeable = False
+    return ret
+
+
+def at_least_one(composition: np.ndarray, draws: int) -> np.ndarray:
+    """
+    the probabilities of a single composition, cached by composition
+    """
+    return _cached(tuple(int(n) for n in composition), draws)
+
+
+__all__ = ['categories', 'category_index', 'membership', 'miss', 'at_least_one_batch', 'composition_vector',
+           'unseen_vector', 'at_least_one']
@@ -0,0 +1,35 @@
+from typing import List
+
+
+class SeatRing:
+    """
+    the seats around the table, linked both ways so that stepping in either order is constant time
+    """
+
+    def __init__(self):
+        self._next: List[int] = []
+        self._prev: List[int] = []
+
+    def add(self) -> int:
+        ind = len(self._next)
+        if not ind:
+            self._next.append(0)
+            self._prev.append(0)
+        else:
+            first = self._next[ind - 1]
+            self._next.append(first)
+            self._prev.append(ind - 1)
+            self._next[ind - 1] = ind
+            self._prev[first] = ind
+        return ind
+
+    def step(self, ind: int, order: int) -> int:
+        if order == 1:
+            return self._next[ind]
+        return self._prev[ind]
+
+    def __len__(self):
+        return len(self._next)
+
+
+__all__ = ['SeatRing']
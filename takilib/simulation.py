@@ -0,0 +1,167 @@
+from typing import Sequence, Union, Callable, NamedTuple, List, Optional
+
+import random
+import math
+from contextlib import contextmanager
+
+from takilib.game import Game
+from takilib.stack import Deck
+from takilib.sink import NullSink
+from takilib.bot import BotPlayer, Policy
+
+
+def bot_game(policies: Sequence[Policy], deck: Union[Deck, int] = 1, cards_per_player=8, setup=True,
+             **kwargs) -> Game:
+    """
+    a silent game with a bot for every policy, the rest of the arguments are passed to the game
+    """
+    game = Game(deck, sink=NullSink(), **kwargs)
+    for policy in policies:
+        game.add_player(type_=BotPlayer, policy=policy)
+    if setup:
+        game.setup_game(cards_per_player)
+    return game
+
+
+def play_game(game: Game, max_turns=10_000) -> bool:
+    """
+    play the game to its end, returns whether the game ended within max_turns
+    """
+    for _ in range(max_turns):
+        if not game.next_turn():
+            return True
+    return False
+
+
+class GamePool:
+    """
+    games that are reset and reused instead of built anew, factory creates a game (with its players) when none are free
+    """
+
+    def __init__(self, factory: Callable[[], Game], size=0):
+        self.factory = factory
+        self._free: List[Game] = [factory() for _ in range(size)]
+
+    def __len__(self):
+        return len(self._free)
+
+    def acquire(self, seed=None) -> Game:
+        """
+        a game that is ready to be set up
+        """
+        try:
+            game = self._free.pop()
+        except IndexError:
+            game = self.factory()
+        game.reset(seed)
+        return game
+
+    def release(self, game: Game):
+        self._free.append(game)
+
+    @contextmanager
+    def game(self, seed=None):
+        game = self.acquire(seed)
+        try:
+            yield game
+        finally:
+            self.release(game)
+
+
+class Deal(NamedTuple):
+    """
+    everything random about the start of a game: the deck order, the starting seat and the turn order. seed drives the
+    rest of the game (reshuffles on reload)
+    """
+    permutation: Sequence[int]
+    first: int
+    order: int
+    seed: int
+
+
+def random_deal(n_players: int, times=1, rng: random.Random = random) -> Deal:
+    size = len(Deck.standard_deck(shuffle=False, times=times))
+    permutation = list(range(size))
+    rng.shuffle(permutation)
+    return Deal(permutation, rng.randrange(n_players), rng.choice([-1, 1]), rng.getrandbits(64))
+
+
+def deal_deck(deal: Deal, times=1) -> Deck:
+    """
+    a new deck, ordered by the deal
+    """
+    cards = Deck.standard_deck(shuffle=False, times=times)
+    return Deck(cards[i] for i in deal.permutation)
+
+
+class DealResult(NamedTuple):
+    deal: Deal
+    # the mean score of every policy over all rotations, a win is worth 1 split between the winners
+    scores: List[float]
+    # the number of rotations that did not end within max_turns
+    unfinished: int
+
+
+def play_deal(policies: Sequence[Callable[[], Policy]], deal: Deal, times=1, cards_per_player=8, max_turns=10_000,
+              **kwargs) -> DealResult:
+    """
+    play the same deal once for every rotation of the policies through the seats, each policy is created anew for every
+    game
+    """
+    n = len(policies)
+    scores = [0.0] * n
+    unfinished = 0
+    for shift in range(n):
+        # the policy at seat i
+        seating = [(i + shift) % n for i in range(n)]
+        game = bot_game([policies[p]() for p in seating], deal_deck(deal, times), setup=False,
+                        rng=random.Random(deal.seed), **kwargs)
+        game.setup_game(cards_per_player, first=deal.first, order=deal.order)
+        if not play_game(game, max_turns):
+            unfinished += 1
+            continue
+        for winner in game.winners:
+            scores[seating[winner.index]] += 1 / len(game.winners)
+    return DealResult(deal, [s / n for s in scores], unfinished)
+
+
+class Comparison(NamedTuple):
+    deals: List[DealResult]
+    mean: List[float]
+    # the standard error of the mean, taken over the per-deal scores
+    stderr: List[float]
+
+    def difference(self, a: int, b: int):
+        """
+        the mean score difference between two policies and its standard error, paired by deal
+        """
+        diffs = [d.scores[a] - d.scores[b] for d in self.deals]
+        return _mean(diffs), _stderr(diffs)
+
+
+def _mean(values: Sequence[float]):
+    return sum(values) / len(values)
+
+
+def _stderr(values: Sequence[float]):
+    if len(values) < 2:
+        return math.inf
+    mean = _mean(values)
+    var = sum((v - mean) ** 2 for v in values) / (len(values) - 1)
+    return math.sqrt(var / len(values))
+
+
+def compare_policies(policies: Sequence[Callable[[], Policy]], deals: int, times=1, rng: Optional[random.Random] = None,
+                     **kwargs) -> Comparison:
+    """
+    compare policies over duplicate deals, every deal is played with the policies rotated through every seat so that
+    the luck of the deal cancels out
+    """
+    rng = rng or random.Random()
+    results = [play_deal(policies, random_deal(len(policies), times, rng), times, **kwargs) for _ in range(deals)]
+    per_policy = [[r.scores[i] for r in results] for i in range(len(policies))]
+    return Comparison(results, [_mean(s) for s in per_policy], [_stderr(s) for s in per_policy])
+
+
+__all__ = ['bot_game', 'play_game', 'GamePool', 'Deal', 'random_deal', 'deal_deck', 'DealResult', 'play_deal',
+           'Comparison', 'compare_policies']
@@ -0,0 +1,111 @@
+from typing import List, Union, IO
+
+import sys
+import socket
+from abc import ABC, abstractmethod
+
+
+class Sink(ABC):
+    """
+    a destination for rendered output, every write is a single block of one or more lines
+    """
+
+    @abstractmethod
+    def write(self, text: str):
+        pass
+
+    def close(self):
+        pass
+
+
+class NullSink(Sink):
+    def write(self, text: str):
+        pass
+
+
+class StdoutSink(Sink):
+    def write(self, text: str):
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+
+class ListSink(Sink, List[str]):
+    """
+    keeps every written line in memory
+    """
+
+    def write(self, text: str):
+        self.extend(text.splitlines())
+
+
+class FileSink(Sink):
+    def __init__(self, file: Union[str, IO[str]]):
+        self._owned = isinstance(file, str)
+        if self._owned:
+            file = open(file, 'a')
+        self.file = file
+
+    def write(self, text: str):
+        self.file.write(text)
+        self.file.flush()
+
+    def close(self):
+        if self._owned:
+            self.file.close()
+
+
+class SocketSink(Sink):
+    def __init__(self, sock: socket.socket, encoding='utf-8'):
+        self.sock = sock
+        self.encoding = encoding
+
+    def write(self, text: str):
+        self.sock.sendall(text.encode(self.encoding))
+
+    def close(self):
+        self.sock.close()
+
+
+class BufferedOutput:
+    """
+    collects lines for a sink and writes them all at once on flush
+    """
+
+    def __init__(self, sink: Sink):
+        self.sink = sink
+        self.buffer: List[str] = []
+        self.last_broadcast = None
+
+    def write(self, line: str):
+        self.buffer.append(line)
+
+    def flush(self):
+        if self.buffer:
+            text = '\n'.join(self.buffer) + '\n'
+            self.buffer.clear()
+            self.sink.write(text)
+
+
+class SpectatorChannel(List[Sink]):
+    """
+    a single buffer shared by any number of sinks, the rendered text is built once per flush and sent to each of them
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.buffer: List[str] = []
+
+    def write(self, line: str):
+        if self:
+            self.buffer.append(line)
+
+    def flush(self):
+        if self.buffer:
+            text = '\n'.join(self.buffer) + '\n'
+            self.buffer.clear()
+            for sink in self:
+                sink.write(text)
+
+
+__all__ = ['Sink', 'NullSink', 'StdoutSink', 'ListSink', 'FileSink', 'SocketSink', 'BufferedOutput',
+           'SpectatorChannel']
@@ -0,0 +1,222 @@
+"""
+an exact solver for endgames: expectimax over draws and minimax over choices, on the rules model.
+values are win probabilities of a single player, searched to increasing depths with the bounds of unfinished lines
+kept, until the best move is proven (or time runs out).
+"""
+from typing import NamedTuple, Tuple, List, Optional, Dict
+from collections import Counter
+import random
+import time
+
+from takilib.bot import Policy, HeuristicPolicy
+from takilib.model import State, Rules, rules, state_from_game, determinized
+from takilib.stack import kind_index
+from takilib.tracker import UnseenCardTracker
+from takilib.zobrist import TranspositionCache
+
+Bounds = Tuple[float, float]
+# probabilities are summed, so comparisons allow for rounding
+epsilon = 1e-9
+
+
+class _Timeout(Exception):
+    pass
+
+
+class Solution(NamedTuple):
+    action: tuple
+    value: Bounds
+    plan: List[tuple]  # the player's decisions that follow the action, before anyone else acts
+
+
+class EndgameSolver:
+    def __init__(self, rules: Rules = rules, cache_size=2 ** 20):
+        self.rules = rules
+        self.cache = TranspositionCache(cache_size)
+        self.nodes = 0
+        self._deadline = None
+        self._player = None
+
+    def solve(self, state: State, player: int, budget: float) -> Optional[Solution]:
+        """
+        the best action for the player, None if it can't be proven within budget seconds
+        """
+        self._deadline = time.monotonic() + budget
+        self._player = player
+        rules = self.rules
+        actions = rules.actions(state)
+        try:
+            depth = 1
+            while True:
+                bounds = {}
+                for a in actions:
+                    bounds[a] = self._search(rules.apply(state, a), depth - 1)
+                    if bounds[a][0] >= 1 - epsilon:
+                        # a certain win, nothing can do better
+                        break
+                best = max(bounds, key=lambda a: bounds[a])
+                if all(bounds[best][0] + epsilon >= bounds[a][1] for a in bounds if a != best) \
+                        and (len(bounds) == len(actions) or bounds[best][0] >= 1 - epsilon):
+                    return Solution(best, bounds[best], self._plan(rules.apply(state, best), depth - 1))
+                depth += 1
+        except _Timeout:
+            return None
+
+    def _plan(self, s: State, depth: int) -> List[tuple]:
+        rules = self.rules
+        ret = []
+        while depth > 0 and not rules.is_terminal(s) and not rules.is_chance(s) \
+                and s.phase != 'turn' and rules.decider(s) == self._player:
+            children = {a: rules.apply(s, a) for a in rules.actions(s)}
+            depth -= 1
+            action = max(children, key=lambda a: self._search(children[a], depth))
+            ret.append(action)
+            s = children[action]
+        return ret
+
+    def _search(self, s: State, depth: int) -> Bounds:
+        rules = self.rules
+        if rules.is_terminal(s):
+            v = rules.value(s, self._player)
+            return v, v
+        key = (self._player, s)
+        hit = self.cache.get(key)
+        if hit is not None and (hit[0] >= depth or hit[1] == hit[2]):
+            return hit[1:]
+        self.nodes += 1
+        if not self.nodes % 1024 and time.monotonic() > self._deadline:
+            raise _Timeout
+        if rules.is_chance(s):
+            # drawing doesn't count towards the depth, there are only so many cards to draw
+            lo = hi = 0.0
+            for p, outcome in rules.outcomes(s):
+                l, h = self._search(outcome, depth)
+                lo += p * l
+                hi += p * h
+            lo, hi = max(lo, 0.0), min(hi, 1.0)
+        elif depth == 0:
+            return 0.0, 1.0
+        else:
+            ours = rules.decider(s) == self._player
+            # a certain win for us (or loss, for the opponents) can't be improved upon
+            certain = 1.0 if ours else 0.0
+            children = []
+            for a in rules.actions(s):
+                child = self._search(rules.apply(s, a), depth - 1)
+                if child[0] == child[1] and abs(child[0] - certain) < epsilon:
+                    children = [child]
+                    break
+                children.append(child)
+            pick = max if ours else min
+            lo = pick(l for (l, _) in children)
+            hi = pick(h for (_, h) in children)
+        self.cache[key] = (depth, lo, hi)
+        return lo, hi
+
+
+class SolverPolicy(Policy):
+    """
+    solves the game when the deck or the hands run low, and falls back to another policy when it can't
+    (or when the position is too large to try). the hidden cards are sampled samples times from the player's tracker
+    (one is kept for every player the policy plays, unless a tracker is given), and the move picked most often is
+    played. the solver only sees every hand if omniscient is set
+    """
+
+    def __init__(self, fallback: Policy = None, budget=0.5, max_deck=8, max_hand_cards=8,
+                 tracker: UnseenCardTracker = None, solver: EndgameSolver = None, omniscient=False, samples=8,
+                 rng: random.Random = None):
+        self.fallback = fallback or HeuristicPolicy()
+        self.budget = budget
+        self.max_deck = max_deck
+        self.max_hand_cards = max_hand_cards
+        self.tracker = tracker
+        self.solver = solver or EndgameSolver()
+        self.omniscient = omniscient
+        self.samples = samples
+        self.random = rng or random.Random()
+        self.plan: List[tuple] = []
+        self._trackers: Dict[int, UnseenCardTracker] = {}
+
+    def applies(self, game):
+        return len(game.deck) <= self.max_deck or sum(len(p.hand) for p in game.players) <= self.max_hand_cards
+
+    def tracker_for(self, player, game) -> UnseenCardTracker:
+        if self.tracker is not None:
+            return self.tracker
+        ret = self._trackers.get(id(player))
+        if ret is None or ret.game is not game or ret.player is not player:
+            if ret is not None:
+                ret.close()
+            ret = self._trackers[id(player)] = UnseenCardTracker(game, player)
+        return ret
+
+    def close(self):
+        for tracker in self._trackers.values():
+            tracker.close()
+        self._trackers.clear()
+
+    def _solve(self, player, game) -> Optional[Solution]:
+        if self.omniscient:
+            return self.solver.solve(state_from_game(game), player.index, self.budget)
+        tracker = self.tracker_for(player, game)
+        root = state_from_game(game)
+        solutions = []
+        for _ in range(self.samples):
+            hands, deck = tracker.sample(self.random)
+            solution = self.solver.solve(determinized(root, hands, deck), player.index, self.budget / self.samples)
+            if solution is not None:
+                solutions.append(solution)
+        if not solutions:
+            return None
+        votes = Counter(s.action for s in solutions)
+        values = {a: sum(s.value[0] for s in solutions if s.action == a) for a in votes}
+        best = max(votes, key=lambda a: (votes[a], values[a]))
+        return next(s for s in solutions if s.action == best)
+
+    def pick_card(self, player, game, playable):
+        if not self.omniscient:
+            # follow the game from the first turn, so the tracker learns what the other players couldn't play
+            self.tracker_for(player, game)
+        self.plan = []
+        if self.applies(game):
+            solution = self._solve(player, game)
+            if solution is not None:
+                self.plan = solution.plan
+                if solution.action[0] == 'draw':
+                    return None
+                return next(c for c in playable if kind_index[c.order_token()] == solution.action[1])
+        return self.fallback.pick_card(player, game, playable)
+
+    def _planned(self, name):
+        if self.plan and self.plan[0][0] == name:
+            return self.plan.pop(0)
+        return None
+
+    def choose_color(self, player, game):
+        planned = self._planned('color')
+        if planned:
+            return planned[1]
+        return self.fallback.choose_color(player, game)
+
+    def place_on_taki(self, player, game, color, placeables):
+        drops = []
+        while self.plan and self.plan[0][0] == 'drop':
+            drops.append(self.plan.pop(0)[1])
+        planned = self._planned('close')
+        if not planned:
+            return self.fallback.place_on_taki(player, game, color, placeables)
+        if planned[1] is None:
+            return []
+        rest = list(placeables)
+        ret = []
+        for kind in drops + [planned[1]]:
+            card = next(c for c in rest if kind_index[c.order_token()] == kind)
+            rest = [c for c in rest if c is not card]
+            ret.append(card)
+        return ret
+
+    def use_breaker(self, player, game, breaker):
+        return self.fallback.use_breaker(player, game, breaker)
+
+
+__all__ = ['Solution', 'EndgameSolver', 'SolverPolicy']
@@ -1,4 +1,6 @@
-from typing import List, Set
+from typing import List, Set, Iterable, Optional, Hashable
+import copy
+from collections import Counter
 import random
 
 from takilib.card import Card, Color, StandardCard, \
@@ -7,8 +9,30 @@ from takilib.card import Card, Color, StandardCard, \
 
 
 class Deck(List[Card]):
-    def shuffle(self):
-        random.shuffle(self)
+    def shuffle(self, rng=random):
+        rng.shuffle(self)
+
+    def reload(self, pile: 'Pile') -> Counter:
+        """
+        return the disposable cards of the pile to the deck, returns their composition
+        """
+        cards = pile.pop_disposable()
+        for card in cards:
+            card.reset()
+        self.extend(cards)
+        return Counter(c.order_token() for c in cards)
+
+    def composition(self) -> Counter:
+        """
+        the number of cards of every kind in the deck
+        """
+        return Counter(c.order_token() for c in self)
+
+    def prototypes(self) -> Iterable[Card]:
+        """
+        a single card of every kind in the deck
+        """
+        return {c.order_token(): c for c in self}.values()
 
     @classmethod
     def standard_deck(cls, shuffle=True, times=1):
@@ -28,34 +52,214 @@ class Deck(List[Card]):
         return ret
 
 
+# a single card of every kind, in a fixed order
+standard_kinds: List[Card] = list(Deck.standard_deck(shuffle=False).prototypes())
+kind_index = {c.order_token(): i for (i, c) in enumerate(standard_kinds)}
+standard_composition = Deck.standard_deck(shuffle=False).composition()
+
+
+def make_card(token: Hashable) -> Card:
+    """
+    a new card of a kind
+    """
+    ret = copy.copy(standard_kinds[kind_index[token]])
+    ret.reset()
+    return ret
+
+
+class CountDeck:
+    """
+    a deck that only stores how many cards of every kind it holds, in a fixed order of kinds. cards are created when
+    they are drawn, drawn at random by the remaining counts. its memory and reloads don't depend on the number of cards
+    """
+
+    def __init__(self, counts: Iterable[int] = (), rng: random.Random = None):
+        self.counts = [0] * len(standard_kinds)
+        for i, n in enumerate(counts):
+            self.counts[i] = n
+        self._len = sum(self.counts)
+        self.random = rng or random
+
+    def __len__(self):
+        return self._len
+
+    def shuffle(self, rng=random):
+        """
+        a count deck is always shuffled, only the generator that draws the cards is set
+        """
+        self.random = rng
+
+    def pop(self) -> Card:
+        if not self._len:
+            raise IndexError('pop from empty deck')
+        r = self.random.randrange(self._len)
+        for i, n in enumerate(self.counts):
+            if r < n:
+                break
+            r -= n
+        self.counts[i] -= 1
+        self._len -= 1
+        return make_card(standard_kinds[i].order_token())
+
+    def append(self, card: Card):
+        self.counts[kind_index[card.order_token()]] += 1
+        self._len += 1
+
+    def extend(self, cards: Iterable[Card]):
+        for card in cards:
+            self.append(card)
+
+    def extend_composition(self, composition: Counter):
+        for token, n in composition.items():
+            self.counts[kind_index[token]] += n
+            self._len += n
+
+    def reload(self, pile: 'Pile') -> Counter:
+        composition = pile.pop_disposable_composition()
+        self.extend_composition(composition)
+        return composition
+
+    def composition(self) -> Counter:
+        return Counter({standard_kinds[i].order_token(): n for (i, n) in enumerate(self.counts) if n})
+
+    def prototypes(self) -> Iterable[Card]:
+        return [standard_kinds[i] for (i, n) in enumerate(self.counts) if n]
+
+    @classmethod
+    def standard_deck(cls, times=1, rng: random.Random = None):
+        ret = cls(rng=rng)
+        ret.extend_composition(Counter({t: n * times for (t, n) in standard_composition.items()}))
+        return ret
+
+
 class Hand(Set[Card]):
-    pass
+    def __init__(self, *args, owner=None):
+        super().__init__(*args)
+        self.owner = owner
+
+    def add(self, card: Card):
+        super().add(card)
+        if self.owner is not None:
+            self.owner.game.notify('hand_changed', self.owner, card, True)
+
+    def remove(self, card: Card):
+        super().remove(card)
+        if self.owner is not None:
+            self.owner.game.notify('hand_changed', self.owner, card, False)
 
 
 class Pile(List[Card]):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    """
+    the played cards. if window is set, only the most recent cards (and those since the last active card) are kept,
+    older cards are written to the archive (if there is one) and only counted, to be recreated when they are reloaded
+    """
+
+    def __init__(self, *args, game=None, window: Optional[int] = None, archive=None):
+        super().__init__(*args)
+        self.game = game
+        self.window = window
+        self.archive = archive
         self._last_iter = None, None
+        self._spilled = Counter()
 
     def append(self, card: Card):
         super().append(card)
         if card.is_iter():
             self._last_iter = (card, len(self) - 1)
+        if self.window is not None and len(self) >= 2 * self.window:
+            self._spill(len(self) - self.window)
+        if self.game is not None:
+            self.game.notify('card_placed', card)
 
     def extend(self, iterable):
         for i in iterable:
             self.append(i)
 
-    def pop_disposable(self):
+    def _spill(self, n):
+        last_card, ind = self._last_iter
+        # only cards that can be reloaded are spilled
+        n = min(n, ind or 0)
+        if not n:
+            return
+        spilled = self[:n]
+        if self.archive is not None:
+            self.archive.extend(spilled)
+        self._spilled.update(c.order_token() for c in spilled)
+        super().__delitem__(slice(0, n))
+        self._last_iter = last_card, ind - n
+
+    def _take_spilled(self) -> List[Card]:
+        ret = [make_card(token) for token in self._spilled.elements()]
+        self._spilled.clear()
+        return ret
+
+    def size(self):
+        """
+        the number of cards in the pile, including those spilled
+        """
+        return len(self) + sum(self._spilled.values())
+
+    def history(self) -> Iterable[Card]:
+        """
+        every card placed on the pile, oldest first. cards from the archive are recreated
+        """
+        if self.archive is not None:
+            yield from self.archive
+        yield from self
+
+    def _pop_disposable(self) -> List[Card]:
         if not self.has_iter():
             raise Exception('no colored cards were placed!')
         last_card, ind = self._last_iter
         ret = self[:ind]
+        if self.archive is not None:
+            self.archive.extend(ret)
         super().__delitem__(slice(0,ind))
         assert self[0] is last_card
         self._last_iter = last_card, 0
         return ret
 
+    def pop_disposable(self):
+        ret = self._pop_disposable()
+        return self._take_spilled() + ret
+
+    def pop_disposable_composition(self) -> Counter:
+        """
+        like pop_disposable, but only the number of cards of every kind is returned, spilled cards are not recreated
+        """
+        ret = Counter()
+        ret.update(c.order_token() for c in self._pop_disposable())
+        ret.update(self._spilled)
+        self._spilled.clear()
+        return ret
+
+    def drain(self) -> List[Card]:
+        """
+        remove every card from the pile
+        """
+        if self.archive is not None:
+            self.archive.extend(self)
+        ret = self._take_spilled() + self[:]
+        self.clear()
+        return ret
+
+    def disposable_composition(self) -> Counter:
+        """
+        the number of cards of every kind that would return to the deck on a reload
+        """
+        ret = Counter(self._spilled)
+        if self.has_iter():
+            ret.update(c.order_token() for c in self[:self._last_iter[1]])
+        return ret
+
+    def retained(self) -> List[Card]:
+        """
+        the last active card and every card placed after it
+        """
+        if not self.has_iter():
+            return self[:]
+        return self[self._last_iter[1]:]
+
     def has_iter(self):
         return self._last_iter[0] is not None
 
@@ -65,6 +269,9 @@ class Pile(List[Card]):
     def clear(self):
         super().clear()
         self._last_iter = None, None
+        self._spilled.clear()
+        if self.game is not None:
+            self.game.notify('pile_cleared')
 
     def pop(self, index: int = ...):
         raise NotImplemented
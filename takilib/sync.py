@@ -0,0 +1,165 @@
+"""
+structured state synchronization for remote clients: a snapshot of the client's view on connection, then the deltas
+of every turn as a single line of json.
+the deltas are: ['+'/'-', kind] a card added to/removed from the client's hand, ['h', player, n] a hand's size,
+['p', kind] a card placed on the pile, ['a', kind] the active card, ['r', n] only the last n cards of the pile are kept,
+['x'] the pile was cleared, ['d', n] the deck's size, and the fields: 'c' color, 's' sign, 't' turn, 'o' order and
+['m', state, stake]
+"""
+from typing import Dict, Hashable, List, Optional, Tuple
+import json
+
+from takilib.card import Color
+from takilib.listener import GameListener
+from takilib.sink import Sink
+from takilib.stack import standard_kinds, kind_index
+from takilib.__util__ import eq_to_all
+
+_field_codes = {'active_color': 'c', 'active_sign': 's', 'next_player_index': 't', 'order': 'o', 'state': 'm'}
+kind_names = [str(c) for c in standard_kinds]
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(',', ':')) + '\n'
+
+
+def _value(value):
+    if value is eq_to_all:
+        return '*'
+    if value is ...:
+        return None
+    if isinstance(value, Color):
+        return value.value
+    if isinstance(value, str):
+        return str(value)
+    return value
+
+
+def _kind(card):
+    if card is None:
+        return None
+    return kind_index[card.order_token()]
+
+
+class SyncClient:
+    def __init__(self, sink: Sink, player=None):
+        self.sink = sink
+        # observers have no player
+        self.player = player
+        # the number of pending deltas that were recorded before the client's snapshot, and are already part of it
+        self.skip = 0
+
+
+class StateSync(GameListener):
+    def __init__(self, game):
+        self.game = game
+        self.clients: Dict[Hashable, SyncClient] = {}
+        # (recipient, delta) where a recipient of None is everyone
+        self._deltas: List[Tuple[Optional[object], list]] = []
+        self.seq = 0
+        self._deck_length = len(game.deck)
+        self._pile_length = len(game.pile)
+        game.subscribe(self)
+
+    def close(self):
+        self.game.unsubscribe(self)
+
+    def connect(self, key: Hashable, sink: Sink, player=None):
+        """
+        connect (or reconnect) a client, it is sent a fresh snapshot
+        """
+        client = self.clients[key] = SyncClient(sink, player)
+        client.skip = len(self._deltas)
+        sink.write(_dumps({'seq': self.seq, 'snapshot': self.snapshot(client.player)}))
+
+    def disconnect(self, key: Hashable):
+        del self.clients[key]
+
+    def snapshot(self, player=None) -> dict:
+        game = self.game
+        ret = {
+            'kinds': kind_names,
+            'players': [[p.name, len(p.hand)] for p in game.players],
+            'top': _kind(game.pile[-1]) if game.pile else None,
+            # the cards of the pile the server keeps in memory, oldest first
+            'pile': [_kind(c) for c in game.pile],
+            'active': _kind(game.pile.last_iter()),
+            'c': _value(game.active_color),
+            's': _value(game.active_sign),
+            'm': [_value(game.state), getattr(game.state, 'stake', None)],
+            'o': game.order,
+            't': game.next_player_index,
+            'd': len(game.deck),
+        }
+        if player is not None:
+            ret['you'] = player.index
+            ret['hand'] = sorted(_kind(c) for c in player.hand)
+        return ret
+
+    def _public(self, *delta):
+        self._deltas.append((None, list(delta)))
+
+    def hand_changed(self, player, card, added: bool):
+        self._deltas.append((player, ['+' if added else '-', _kind(card)]))
+        self._public('h', player.index, len(player.hand))
+
+    def card_placed(self, card):
+        self._public('p', _kind(card))
+        pile = self.game.pile
+        if pile.last_iter() is card:
+            self._public('a', _kind(card))
+        self._pile_length += 1
+        if len(pile) != self._pile_length:
+            # older cards were spilled out of memory
+            self._trim()
+
+    def _trim(self):
+        self._pile_length = len(self.game.pile)
+        self._public('r', self._pile_length)
+
+    def pile_reloaded(self, composition):
+        self._trim()
+
+    def pile_cleared(self):
+        self._pile_length = 0
+        self._public('x')
+
+    def field_changed(self, name, old, new):
+        code = _field_codes.get(name)
+        if code == 'm':
+            self._public(code, _value(new), getattr(new, 'stake', None))
+        elif code:
+            self._public(code, _value(new))
+
+    def game_reset(self):
+        # the pending deltas only undo the last game, every client gets a fresh snapshot instead
+        self._deltas.clear()
+        self._deck_length = len(self.game.deck)
+        self._pile_length = len(self.game.pile)
+        self.seq += 1
+        for client in self.clients.values():
+            client.skip = 0
+            client.sink.write(_dumps({'seq': self.seq, 'snapshot': self.snapshot(client.player)}))
+
+    def flushed(self):
+        if len(self.game.deck) != self._deck_length:
+            self._deck_length = len(self.game.deck)
+            self._public('d', self._deck_length)
+        if not self._deltas:
+            return
+        self.seq += 1
+        public_text = None
+        for client in self.clients.values():
+            if client.player is None and not client.skip:
+                # every observer gets the same text
+                if public_text is None:
+                    public_text = _dumps({'seq': self.seq, 'd': [d for (r, d) in self._deltas if r is None]})
+                client.sink.write(public_text)
+            else:
+                deltas = [d for (r, d) in self._deltas[client.skip:] if r is None or r is client.player]
+                client.sink.write(_dumps({'seq': self.seq, 'd': deltas}))
+                client.skip = 0
+        self._deltas.clear()
+
+
+__all__ = ['kind_names', 'SyncClient', 'StateSync']
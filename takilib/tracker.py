@@ -0,0 +1,152 @@
+from typing import Dict, List, Hashable, FrozenSet, Tuple, Iterable
+from collections import Counter
+import random
+
+from takilib.listener import GameListener
+
+
+def color_of(card):
+    return getattr(card, 'color', None)
+
+
+def sign_of(card):
+    return getattr(card, 'sign', None)
+
+
+class DrawConstraint:
+    """
+    an opponent drew instead of playing, so (assuming they play whenever they can) the cards they held at the time are
+    none of the excluded kinds. held is a lower bound of how many of those cards are still in their hand.
+    """
+
+    def __init__(self, excluded: FrozenSet[Hashable], held: int):
+        self.excluded = excluded
+        self.held = held
+
+
+class UnseenCardTracker(GameListener):
+    """
+    counts of the cards a player has not seen (in the deck or in other players' hands), by kind, color and sign
+    """
+
+    def __init__(self, game, player):
+        self.game = game
+        self.player = player
+        # a representative card of every kind, to check what was playable
+        self.prototypes = {}
+        self.reset()
+        game.subscribe(self)
+
+    def reset(self):
+        game = self.game
+        self.cards = Counter()
+        self.by_color = Counter()
+        self.by_sign = Counter()
+        self.constraints: Dict[int, List[DrawConstraint]] = {}
+        # our cards that left our hand and haven't reached the pile yet
+        self._leaving = set()
+
+        for card in game.deck.prototypes():
+            self.prototypes.setdefault(card.order_token(), card)
+        self.cards.update(game.deck.composition())
+        for p in game.players:
+            for card in p.hand:
+                token = card.order_token()
+                self.prototypes.setdefault(token, card)
+                if p is not self.player:
+                    self.cards[token] += 1
+        for card in game.pile:
+            self.prototypes.setdefault(card.order_token(), card)
+        for token, count in self.cards.items():
+            card = self.prototypes[token]
+            self.by_color[color_of(card)] += count
+            self.by_sign[sign_of(card)] += count
+
+    def _change(self, card, n):
+        self.cards[card.order_token()] += n
+        self.by_color[color_of(card)] += n
+        self.by_sign[sign_of(card)] += n
+
+    def close(self):
+        self.game.unsubscribe(self)
+
+    def unseen(self) -> int:
+        return sum(self.cards.values())
+
+    def hand_changed(self, player, card, added: bool):
+        if player is self.player:
+            if added:
+                self._change(card, -1)
+            else:
+                self._leaving.add(card)
+            return
+        if added:
+            return
+        constraints = self.constraints.get(player.index)
+        if not constraints:
+            return
+        token = card.order_token()
+        for constraint in constraints:
+            if token not in constraint.excluded:
+                # the card might have been one of those held
+                constraint.held -= 1
+        constraints[:] = [c for c in constraints if c.held > 0]
+
+    def card_placed(self, card):
+        if card in self._leaving:
+            self._leaving.discard(card)
+        else:
+            self._change(card, -1)
+
+    def pile_reloaded(self, composition):
+        for token, n in composition.items():
+            self._change(self.prototypes[token], n)
+
+    def pile_cleared(self):
+        self.reset()
+
+    def game_reset(self):
+        self.reset()
+
+    def passed(self, player):
+        if player is self.player or not player.hand:
+            return
+        excluded = frozenset(t for (t, c) in self.prototypes.items() if c.can_play(self.game))
+        self.constraints.setdefault(player.index, []).append(DrawConstraint(excluded, len(player.hand)))
+
+    def _pick(self, pool: Counter, excluded: Iterable[Hashable], rng):
+        candidates = [t for (t, c) in pool.items() if c > 0 and t not in excluded]
+        if not candidates:
+            candidates = [t for (t, c) in pool.items() if c > 0]
+        ret = rng.choices(candidates, weights=[pool[t] for t in candidates])[0]
+        pool[ret] -= 1
+        return ret
+
+    def sample(self, rng=random) -> Tuple[Dict[int, List[Hashable]], List[Hashable]]:
+        """
+        deal the unseen cards to the other players' hands consistently with the known constraints.
+        returns the sampled hands by player index, and the remaining cards (in no particular order) as the deck
+        """
+        pool = +self.cards
+        hands = {}
+        for p in self.game.players:
+            if p is self.player:
+                continue
+            hand = []
+            constraints = self.constraints.get(p.index, ())
+            # cards held through several draws are assumed to be the older ones, so they avoid every exclusion
+            for slot in range(min(len(p.hand), max((c.held for c in constraints), default=0))):
+                excluded = set()
+                for c in constraints:
+                    if c.held > slot:
+                        excluded.update(c.excluded)
+                hand.append(self._pick(pool, excluded, rng))
+            while len(hand) < len(p.hand) and sum(pool.values()):
+                hand.append(self._pick(pool, (), rng))
+            hands[p.index] = hand
+        deck = list(pool.elements())
+        rng.shuffle(deck)
+        return hands, deck
+
+
+__all__ = ['color_of', 'sign_of', 'DrawConstraint', 'UnseenCardTracker']
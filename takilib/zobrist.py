@@ -0,0 +1,142 @@
+from typing import Dict, Hashable
+
+import hashlib
+from collections import OrderedDict
+
+from takilib.card import Color
+from takilib.listener import GameListener
+from takilib.__util__ import eq_to_all
+
+_MASK = 2 ** 64 - 1
+
+
+def value_token(value) -> Hashable:
+    """
+    a plain hashable stand-in for a field value, the special values of the game don't hash (or compare) normally
+    """
+    if value is eq_to_all:
+        return '*'
+    if value is ...:
+        return '...'
+    if isinstance(value, Color):
+        return value.value
+    if isinstance(value, str):
+        # staked states compare equal regardless of their stake
+        return str(value), getattr(value, 'stake', None)
+    return value
+
+
+class ZobristKeys:
+    """
+    a random 64 bit key for every token, the keys are derived from the token so they agree across processes
+    """
+
+    def __init__(self, salt=b'taki'):
+        self.salt = salt
+        self._keys: Dict[Hashable, int] = {}
+
+    def __getitem__(self, token) -> int:
+        ret = self._keys.get(token)
+        if ret is None:
+            digest = hashlib.blake2b(repr(token).encode(), digest_size=8, key=self.salt).digest()
+            ret = self._keys[token] = int.from_bytes(digest, 'little')
+        return ret
+
+
+default_keys = ZobristKeys()
+
+
+class ZobristHasher(GameListener):
+    """
+    an incrementally updated hash of the decision-relevant state of a game.
+    hands are multisets (a multi-deck game has duplicates) so their keys are summed, the rest are xor-ed in and out.
+    """
+    fields = ('active_color', 'active_sign', 'state', 'order', 'next_player_index')
+
+    def __init__(self, game, keys: ZobristKeys = default_keys):
+        self.game = game
+        self.keys = keys
+        self.recompute()
+
+    def recompute(self):
+        self.hands = 0
+        for player in self.game.players:
+            for card in player.hand:
+                self.hand_changed(player, card, True)
+        self.fields_key = 0
+        for name in self.fields:
+            self.fields_key ^= self._field_key(name, getattr(self.game, name))
+        self._set_top()
+
+    def _field_key(self, name, value):
+        return self.keys[name, value_token(value)]
+
+    def _set_top(self):
+        pile = self.game.pile
+        top = pile[-1].order_token() if pile else None
+        self.last_iter = pile.last_iter()
+        last = self.last_iter.order_token() if self.last_iter else None
+        self.pile_key = self.keys['top', top] ^ self.keys['last_iter', last]
+
+    @property
+    def value(self) -> int:
+        return self.hands ^ self.fields_key ^ self.pile_key
+
+    def hand_changed(self, player, card, added: bool):
+        key = self.keys['hand', player.index, card.order_token()]
+        if added:
+            self.hands = (self.hands + key) & _MASK
+        else:
+            self.hands = (self.hands - key) & _MASK
+
+    def field_changed(self, name, old, new):
+        if name in self.fields:
+            self.fields_key ^= self._field_key(name, old) ^ self._field_key(name, new)
+
+    def card_placed(self, card):
+        self._set_top()
+
+    def game_reset(self):
+        self.recompute()
+
+    def pile_cleared(self):
+        self._set_top()
+
+
+class TranspositionCache:
+    """
+    a least-recently-used mapping, meant to be keyed by game hashes
+    """
+
+    def __init__(self, maxsize=2 ** 16):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key, default=None):
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = self.misses = 0
+
+
+__all__ = ['value_token', 'ZobristKeys', 'default_keys', 'ZobristHasher', 'TranspositionCache']